@@ -0,0 +1,268 @@
+"""
+Anthropic Stub: A tiny local stand-in for the Claude API.
+Used to test article writing (direct, streaming and batch mode) without an
+API key, without spending tokens, and without waiting on real responses:
+    python anthropic_stub.py                                     # listen on 127.0.0.1:8765
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 python main.py      # (any ANTHROPIC_API_KEY works)
+It answers just enough of the API for the anthropic library: messages
+(plain and streamed), and message batches (create, retrieve, results,
+cancel). Every "article" is a short placeholder built from the video title.
+It can also answer a share of requests with 529 Overloaded, to exercise
+the retry and adaptive concurrency logic.
+"""
+
+import re
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _prompt_text(params):
+    """
+    The text of the last user message in a request.
+    """
+    for message in reversed(params.get("messages", [])):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content", "")
+        if isinstance(content, str):
+            return content
+        return "\n".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return ""
+
+
+def _article_text(params):
+    """
+    A placeholder article for a request (uses the video title when there is one).
+    """
+    prompt = _prompt_text(params)
+    match = re.search(r"^VIDEO TITLE: (.*)$", prompt, re.MULTILINE)
+    title = match.group(1).strip() if match else "Untitled"
+    return (f"# Notes on {title}\n\n"
+            f"This is a **placeholder article** from the local API stub. "
+            f"The prompt was {len(prompt.split())} words long.\n\n"
+            f"- It came from `anthropic_stub.py`\n"
+            f"- No tokens were spent writing it\n")
+
+
+def _message(params, text, stop_reason="end_turn"):
+    """
+    A Messages API response object.
+    """
+    prompt_words = len(_prompt_text(params).split())
+    return {
+        "id": f"msg_stub_{random.getrandbits(48):012x}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "stub"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": prompt_words * 4 // 3,
+            "output_tokens": len(text.split()) * 4 // 3,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0
+        }
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    One API request.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, obj, status=200, content_type="application/json"):
+        body = obj if isinstance(obj, bytes) else json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, error_type, message):
+        self.send_json({"type": "error", "error": {"type": error_type, "message": message}}, status)
+
+    def read_json(self):
+        length = int(self.headers.get("content-length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self):
+        stub = self.server
+        params = self.read_json()
+        path = self.path.split("?", 1)[0].rstrip("/")
+
+        if random.random() < stub.fail_rate:
+            with stub.lock:
+                stub.stats["overloaded"] += 1
+            self.send_error_json(529, "overloaded_error", "Overloaded (anthropic_stub fail rate)")
+            return
+
+        if path == "/v1/messages":
+            with stub.lock:
+                stub.stats["messages"] += 1
+            if params.get("stream"):
+                self._stream_message(params)
+            else:
+                self.send_json(_message(params, _article_text(params)))
+        elif path == "/v1/messages/batches":
+            self.send_json(self._create_batch(params))
+        elif path.startswith("/v1/messages/batches/") and path.endswith("/cancel"):
+            batch = self._find_batch(path.split("/")[4])
+            if batch:
+                batch["processing_status"] = "ended"
+                batch["cancel_initiated_at"] = batch["ended_at"]
+                self.send_json(batch)
+        else:
+            self.send_error_json(404, "not_found_error", f"No such endpoint: {path}")
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        parts = path.split("/")
+
+        if path.startswith("/v1/messages/batches/") and len(parts) == 5:
+            batch = self._find_batch(parts[4])
+            if batch:
+                self.send_json(batch)
+        elif path.startswith("/v1/messages/batches/") and len(parts) == 6 and parts[5] == "results":
+            batch = self._find_batch(parts[4])
+            if batch:
+                with self.server.lock:
+                    lines = self.server.batch_results[batch["id"]]
+                self.send_json("\n".join(json.dumps(line) for line in lines).encode("utf-8"),
+                               content_type="application/binary")
+        else:
+            self.send_error_json(404, "not_found_error", f"No such endpoint: {path}")
+
+    def _find_batch(self, batch_id):
+        with self.server.lock:
+            batch = self.server.batches.get(batch_id)
+        if batch is None:
+            self.send_error_json(404, "not_found_error", f"No such batch: {batch_id}")
+        return batch
+
+    def _create_batch(self, params):
+        """
+        "Process" a whole batch at once: it's already ended when it's returned.
+        """
+        stub = self.server
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        batch_id = f"msgbatch_stub_{random.getrandbits(48):012x}"
+        requests = params.get("requests", [])
+
+        results = [
+            {"custom_id": request["custom_id"],
+             "result": {"type": "succeeded",
+                        "message": _message(request["params"], _article_text(request["params"]))}}
+            for request in requests
+        ]
+        batch = {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended",
+            "request_counts": {"processing": 0, "succeeded": len(results), "errored": 0,
+                               "canceled": 0, "expired": 0},
+            "created_at": now,
+            "expires_at": now,
+            "ended_at": now,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"http://{self.headers.get('host')}/v1/messages/batches/{batch_id}/results"
+        }
+
+        with stub.lock:
+            stub.batches[batch_id] = batch
+            stub.batch_results[batch_id] = results
+            stub.stats["batches"] += 1
+            stub.stats["batch_requests"] += len(requests)
+        return batch
+
+    def _stream_message(self, params):
+        """
+        Send the article as server-sent events, a few words per event.
+        """
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.end_headers()
+
+        def event(name, data):
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        message = _message(params, "")
+        text = _article_text(params)
+        message["content"] = []
+        message["stop_reason"] = None
+
+        event("message_start", {"type": "message_start", "message": message})
+        event("content_block_start", {"type": "content_block_start", "index": 0,
+                                       "content_block": {"type": "text", "text": ""}})
+        for piece in re.findall(r"\S+\s*", text):
+            event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": "text_delta", "text": piece}})
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta",
+                                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                "usage": {"output_tokens": len(text.split()) * 4 // 3}})
+        event("message_stop", {"type": "message_stop"})
+
+
+class AnthropicStub(ThreadingHTTPServer):
+    """
+    The stub server. Start it in the background with start(), read .stats.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8765, fail_rate=0.0):
+        super().__init__((host, port), _StubHandler)
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.batches = {}
+        self.batch_results = {}
+        self.stats = {"messages": 0, "batches": 0, "batch_requests": 0, "overloaded": 0}
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.port}"
+
+    def start(self):
+        """
+        Serve in a background thread. Returns the stub.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# Run the stub on its own
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the Claude API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="share of requests to answer with 529 Overloaded (0-1)")
+    args = parser.parse_args()
+
+    stub = AnthropicStub(args.host, args.port, args.fail_rate)
+    print(f"Claude API stub listening on {stub.base_url} (Ctrl+C to stop)")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{stub.stats}")
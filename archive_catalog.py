@@ -0,0 +1,258 @@
+"""
+Archive Catalog: An index of every newsletter saved in newsletters/.
+Each time a digest is archived it's added to newsletters/catalog.db, with
+lookups by date, channel and video. Listing past digests reads one page
+from the index instead of opening every JSON file in the folder, so it
+stays fast no matter how big the archive gets. Digests archived before
+the catalog existed are imported automatically the first time.
+"""
+
+import os
+import glob
+import json
+from datetime import datetime
+from storage import connect_db
+
+# Folder with the archived newsletters, and the catalog inside it
+NEWSLETTERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "newsletters")
+CATALOG_DB = os.path.join(NEWSLETTERS_DIR, "catalog.db")
+
+
+def _connect():
+    """
+    Open the catalog, creating it (and importing old digests) the first time.
+    """
+    os.makedirs(NEWSLETTERS_DIR, exist_ok=True)
+    return connect_db(CATALOG_DB, _create_tables, rows_as_dicts=True)
+
+
+def _create_tables(conn):
+    """
+    First use: create the tables, then import digests archived before the catalog existed.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS digests (
+            timestamp TEXT PRIMARY KEY,
+            day TEXT NOT NULL,
+            date TEXT,
+            article_count INTEGER NOT NULL,
+            html_file TEXT,
+            epub_file TEXT,
+            part INTEGER,
+            total_parts INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_digests_day ON digests (day);
+
+        CREATE TABLE IF NOT EXISTS digest_articles (
+            timestamp TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            video_id TEXT,
+            title TEXT,
+            channel TEXT,
+            url TEXT,
+            PRIMARY KEY (timestamp, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_articles_channel ON digest_articles (channel, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_articles_video ON digest_articles (video_id);
+    """)
+    conn.commit()
+    if conn.execute("SELECT COUNT(*) FROM digests").fetchone()[0] == 0:
+        backfill(conn)
+
+
+def _day(timestamp):
+    """
+    "20250101_083000" -> "2025-01-01"
+    """
+    return datetime.strptime(timestamp[:8], "%Y%m%d").strftime("%Y-%m-%d")
+
+
+def _insert(conn, metadata, articles):
+    timestamp = metadata["timestamp"]
+    conn.execute(
+        "INSERT OR REPLACE INTO digests "
+        "(timestamp, day, date, article_count, html_file, epub_file, part, total_parts) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (timestamp, _day(timestamp), metadata.get("date"), metadata.get("article_count", len(articles)),
+         metadata.get("html_file"), metadata.get("epub_file"),
+         metadata.get("part"), metadata.get("total_parts"))
+    )
+    conn.execute("DELETE FROM digest_articles WHERE timestamp = ?", (timestamp,))
+    conn.executemany(
+        "INSERT INTO digest_articles (timestamp, position, video_id, title, channel, url) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(timestamp, position, article.get("video_id"), article.get("title"),
+          article.get("channel"), article.get("url"))
+         for position, article in enumerate(articles)]
+    )
+
+
+def add_digest(metadata, articles):
+    """
+    Add one archived digest (its metadata JSON and its articles) to the catalog.
+    """
+    conn = _connect()
+    try:
+        with conn:
+            _insert(conn, metadata, articles)
+    finally:
+        conn.close()
+
+
+def backfill(conn=None):
+    """
+    Import every newsletter_*.json in the archive that isn't in the catalog yet.
+    Old metadata files only have titles and channels (no video IDs or links).
+    Returns how many digests were added.
+    """
+    own_conn = conn is None
+    conn = conn or _connect()
+    added = 0
+
+    try:
+        known = {row[0] for row in conn.execute("SELECT timestamp FROM digests")}
+        with conn:
+            for path in sorted(glob.glob(os.path.join(NEWSLETTERS_DIR, "newsletter_*.json"))):
+                with open(path, "r") as f:
+                    metadata = json.load(f)
+                if metadata.get("timestamp") in known or "timestamp" not in metadata:
+                    continue
+                articles = [
+                    {"title": title, "channel": channel}
+                    for title, channel in zip(metadata.get("titles", []), metadata.get("channels", []))
+                ]
+                _insert(conn, metadata, articles)
+                added += 1
+    finally:
+        if own_conn:
+            conn.close()
+
+    if added:
+        print(f"  ✓ Added {added} archived newsletter(s) to the catalog")
+    return added
+
+
+def _digests(conn, rows):
+    """
+    Turn digest rows into dicts, each with its list of articles.
+    """
+    digests = [dict(row) for row in rows]
+    for digest in digests:
+        digest["articles"] = [
+            dict(article) for article in conn.execute(
+                "SELECT video_id, title, channel, url FROM digest_articles "
+                "WHERE timestamp = ? ORDER BY position",
+                (digest["timestamp"],)
+            )
+        ]
+    return digests
+
+
+def list_digests(limit=20, before=None):
+    """
+    One page of digests, newest first.
+    For the next page, pass the last digest's "timestamp" as `before`.
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM digests WHERE timestamp < ? ORDER BY timestamp DESC LIMIT ?",
+            (before or "~", limit)
+        ).fetchall()
+        return _digests(conn, rows)
+    finally:
+        conn.close()
+
+
+def digests_on(day):
+    """
+    Every digest sent on one day ("2025-01-01"), in the order they were sent.
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM digests WHERE day = ? ORDER BY timestamp", (day,)
+        ).fetchall()
+        return _digests(conn, rows)
+    finally:
+        conn.close()
+
+
+def digests_for_channel(channel, limit=20, before=None):
+    """
+    One page of digests with an article from this channel, newest first.
+    Paginate with `before` like list_digests().
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT d.* FROM digest_articles a JOIN digests d ON d.timestamp = a.timestamp "
+            "WHERE a.channel = ? AND a.timestamp < ? ORDER BY d.timestamp DESC LIMIT ?",
+            (channel, before or "~", limit)
+        ).fetchall()
+        return _digests(conn, rows)
+    finally:
+        conn.close()
+
+
+def digests_for_video(video_id):
+    """
+    The digest(s) a video's article was sent in.
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT d.* FROM digest_articles a JOIN digests d ON d.timestamp = a.timestamp "
+            "WHERE a.video_id = ? ORDER BY a.timestamp",
+            (video_id,)
+        ).fetchall()
+        return _digests(conn, rows)
+    finally:
+        conn.close()
+
+
+def count_digests():
+    """
+    How many digests are in the archive.
+    """
+    conn = _connect()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM digests").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# Utility to browse the archive
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Browse the newsletter archive.")
+    parser.add_argument("--channel", help="only digests with this channel")
+    parser.add_argument("--video", help="find the digest a video ID was sent in")
+    parser.add_argument("--day", help="digests sent on this day (YYYY-MM-DD)")
+    parser.add_argument("--before", help="show digests older than this timestamp (next page)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--backfill", action="store_true", help="import newsletters missing from the catalog")
+    args = parser.parse_args()
+
+    if args.backfill:
+        print(f"Added {backfill()} digest(s).")
+    else:
+        if args.video:
+            digests = digests_for_video(args.video)
+        elif args.day:
+            digests = digests_on(args.day)
+        elif args.channel:
+            digests = digests_for_channel(args.channel, args.limit, args.before)
+        else:
+            digests = list_digests(args.limit, args.before)
+
+        print(f"Archived digests: {count_digests()}\n")
+        for digest in digests:
+            part = f" (part {digest['part']} of {digest['total_parts']})" if digest["part"] else ""
+            print(f"• {digest['timestamp']}: {digest['date']}{part} - {digest['article_count']} article(s)")
+            for article in digest["articles"]:
+                print(f"  - {article['channel']}: {(article['title'] or '')[:50]}")
+
+        if len(digests) == args.limit and not (args.video or args.day):
+            print(f"\nNext page: --before {digests[-1]['timestamp']}")
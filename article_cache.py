@@ -0,0 +1,87 @@
+"""
+Article Cache: Never pay for the same article twice.
+Articles are stored under a fingerprint of everything that went into them
+(model, prompt template, video details and transcript). If the newsletter
+fails to send, or we re-render an old digest, the articles come from here.
+Changing the model or the prompt changes the fingerprint, so stale articles
+are never reused.
+"""
+
+import os
+import json
+import time
+from disk_cache import DiskCache
+
+# Folder to store cached articles
+ARTICLE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "article_cache")
+
+# Least recently used articles are deleted past this size...
+ARTICLE_CACHE_MAX_MB = float(os.getenv("ARTICLE_CACHE_MAX_MB", "100"))
+
+# ...and articles older than this are ignored (and deleted when found)
+ARTICLE_CACHE_MAX_AGE_DAYS = float(os.getenv("ARTICLE_CACHE_MAX_AGE_DAYS", "90"))
+
+_cache = DiskCache(ARTICLE_CACHE_DIR, int(ARTICLE_CACHE_MAX_MB * 1024 * 1024))
+
+
+def load_article(key):
+    """
+    Return the cached article for this fingerprint, or None.
+    """
+    data = _cache.get(key)
+    if data is None:
+        return None
+
+    entry = json.loads(data)
+    age_days = (time.time() - entry.get("created_at", 0)) / 86400
+    if age_days > ARTICLE_CACHE_MAX_AGE_DAYS:
+        _cache.delete(key)
+        return None
+
+    return entry["article"]
+
+
+def save_article(key, video, article):
+    """
+    Store a freshly written article under its fingerprint.
+    """
+    _cache.put_json(key, {
+        "video_id": video.get("video_id"),
+        "title": video.get("title"),
+        "article": article,
+        "created_at": time.time()
+    })
+
+
+def invalidate(key):
+    """
+    Forget one article (the next run writes it again).
+    """
+    _cache.delete(key)
+
+
+def clear():
+    """
+    Forget every cached article.
+    """
+    _cache.clear()
+
+
+def cache_stats():
+    """
+    Hit/miss counts for this run, plus the number and size of cached articles.
+    """
+    return _cache.stats()
+
+
+# Utility to view/clear the cache
+if __name__ == "__main__":
+    import sys
+
+    if "--clear" in sys.argv:
+        clear()
+        print("Article cache cleared.")
+    else:
+        stats = cache_stats()
+        print(f"Cached articles: {stats['entries']} ({stats['bytes'] / 1024 / 1024:.1f} MB "
+              f"of {ARTICLE_CACHE_MAX_MB:.0f} MB)")
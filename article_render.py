@@ -0,0 +1,161 @@
+"""
+Article Rendering: Converts each article's markdown exactly once.
+The email HTML, the EPUB chapters and the plain-text email all use the same
+render (an HTML fragment plus a plain-text version), and renders are cached
+on disk so regenerating an old digest doesn't parse the markdown again.
+The markdown library is pluggable: set MARKDOWN_BACKEND to use a faster one.
+"""
+
+import os
+import re
+import hashlib
+import threading
+from html.parser import HTMLParser
+from disk_cache import DiskCache
+
+# Which markdown library to use: "markdown" (default), "mistune" or "markdown_it"
+MARKDOWN_BACKEND = os.getenv("MARKDOWN_BACKEND", "markdown")
+
+# Folder to store rendered articles
+RENDER_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_cache")
+RENDER_CACHE_MAX_MB = float(os.getenv("RENDER_CACHE_MAX_MB", "50"))
+
+# Bump this when the rendering itself changes, so old cached renders aren't reused
+_RENDER_VERSION = 3
+
+_cache = DiskCache(RENDER_CACHE_DIR, int(RENDER_CACHE_MAX_MB * 1024 * 1024))
+
+# Renders from this run, so the same article is never even read from disk twice
+_renders = {}
+_lock = threading.Lock()
+_converter = None
+
+
+def _load_converter():
+    """
+    Pick the markdown -> HTML function for MARKDOWN_BACKEND.
+    Falls back to the standard `markdown` library if the chosen one isn't installed.
+    """
+    try:
+        if MARKDOWN_BACKEND == "mistune":
+            import mistune
+            return "mistune", mistune.html
+        if MARKDOWN_BACKEND == "markdown_it":
+            from markdown_it import MarkdownIt
+            return "markdown_it", MarkdownIt().render
+    except ImportError:
+        print(f"  ⚠ Markdown backend '{MARKDOWN_BACKEND}' not installed, using 'markdown'")
+
+    import markdown
+    return "markdown", markdown.markdown
+
+
+def _get_converter():
+    global _converter
+    with _lock:
+        if _converter is None:
+            _converter = _load_converter()
+        return _converter
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Turns rendered HTML back into readable plain text (paragraphs, bullets).
+    """
+
+    BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "ul", "ol", "hr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.in_pre = False
+        self.link = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "pre":
+            self.in_pre = True
+        if tag == "a":
+            # Remember where the link text starts, so the URL can follow it
+            self.link = (dict(attrs).get("href"), len(self.parts))
+        if tag in self.BLOCK_TAGS:
+            # The first paragraph of a list item goes on the bullet's line
+            if not (self.parts and self.parts[-1] == "\n- "):
+                self.parts.append("\n\n")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag == "br":
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "pre":
+            self.in_pre = False
+        if tag == "a" and self.link:
+            href, start = self.link
+            self.link = None
+            label = "".join(self.parts[start:]).strip()
+            if href and href != label and not href.startswith("#"):
+                self.parts.append(f" ({href})")
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        # Keep code blocks exactly as they are
+        if self.in_pre:
+            self.parts.append(data)
+            return
+
+        # Elsewhere any run of whitespace is one space (it separates inline words),
+        # except right after a line break, where it's just the gap between block tags
+        data = re.sub(r"\s+", " ", data)
+        if not self.parts or self.parts[-1][-1:].isspace():
+            data = data.lstrip()
+        if data:
+            self.parts.append(data)
+
+    def text(self):
+        text = "".join(self.parts)
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def html_to_text(html):
+    """
+    Plain-text version of an HTML fragment.
+    """
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+def render_article(article):
+    """
+    Render an article's markdown. Returns {"html": ..., "text": ...}.
+    Each distinct article is converted once, then reused from memory or disk.
+    """
+    backend, convert = _get_converter()
+    key = hashlib.sha256(
+        f"{_RENDER_VERSION}\n{backend}\n{article['article']}".encode("utf-8")
+    ).hexdigest()
+
+    with _lock:
+        rendered = _renders.get(key)
+    if rendered:
+        return rendered
+
+    rendered = _cache.get_json(key)
+    if rendered is None:
+        html = convert(article["article"])
+        rendered = {"html": html, "text": html_to_text(html)}
+        _cache.put_json(key, rendered)
+
+    with _lock:
+        _renders[key] = rendered
+    return rendered
+
+
+def render_articles(articles):
+    """
+    Render a list of articles (same order).
+    """
+    return [render_article(article) for article in articles]
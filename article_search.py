@@ -0,0 +1,178 @@
+"""
+Article Search: Full-text search over every archived article.
+Each time a digest is archived its articles are added to a search index
+(newsletters/search.db, using SQLite's built-in FTS5 full-text engine).
+Results are ranked with BM25 - the standard "best match" scoring - with
+title matches counting most. Set SEARCH_TRANSCRIPTS=1 to also index the
+video transcripts (from the transcript cache), so you can find what was
+said even if it didn't make it into the article.
+    python article_search.py "battery life"
+"""
+
+import os
+import re
+import sqlite3
+from archive_catalog import NEWSLETTERS_DIR
+from storage import connect_db
+
+# The search index
+SEARCH_DB = os.path.join(NEWSLETTERS_DIR, "search.db")
+
+# Also index each video's transcript (makes the index several times bigger)
+SEARCH_TRANSCRIPTS = os.getenv("SEARCH_TRANSCRIPTS", "0") == "1"
+
+# How much a match counts in each field (title, channel, article, transcript)
+_FIELD_WEIGHTS = (5.0, 2.0, 1.0, 0.5)
+
+
+def _connect():
+    """
+    Open the search index, creating it the first time.
+    """
+    os.makedirs(NEWSLETTERS_DIR, exist_ok=True)
+    return connect_db(SEARCH_DB, _create_tables, rows_as_dicts=True)
+
+
+def _create_tables(conn):
+    """
+    First use: create the document table and its full-text index.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            video_id TEXT,
+            title TEXT,
+            channel TEXT,
+            url TEXT,
+            UNIQUE (timestamp, position)
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            title, channel, article, transcript,
+            tokenize = 'porter unicode61'
+        );
+    """)
+    conn.commit()
+
+
+def _transcript_text(video_id):
+    """
+    The cached transcript for a video, or "" if we don't have it.
+    """
+    if not (SEARCH_TRANSCRIPTS and video_id):
+        return ""
+
+    from get_transcripts import TRANSCRIPT_LANGUAGES
+    from transcript_cache import load_transcript
+
+    entry = load_transcript(video_id, TRANSCRIPT_LANGUAGES)
+    return entry["text"] if entry else ""
+
+
+def index_articles(timestamp, articles):
+    """
+    Add one archived digest's articles to the index (re-indexing it is safe).
+    """
+    conn = _connect()
+    try:
+        with conn:
+            for position, article in enumerate(articles):
+                old = conn.execute(
+                    "SELECT id FROM documents WHERE timestamp = ? AND position = ?",
+                    (timestamp, position)
+                ).fetchone()
+                if old:
+                    conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (old["id"],))
+                    conn.execute("DELETE FROM documents WHERE id = ?", (old["id"],))
+
+                cursor = conn.execute(
+                    "INSERT INTO documents (timestamp, position, video_id, title, channel, url) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (timestamp, position, article.get("video_id"), article.get("title"),
+                     article.get("channel"), article.get("url"))
+                )
+                conn.execute(
+                    "INSERT INTO documents_fts (rowid, title, channel, article, transcript) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, article.get("title") or "", article.get("channel") or "",
+                     article.get("article") or "", _transcript_text(article.get("video_id")))
+                )
+    finally:
+        conn.close()
+
+
+def _quote_terms(query):
+    """
+    Turn free text into a safe FTS5 query (every word must appear).
+    """
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+
+def search(query, limit=10, channel=None):
+    """
+    Find archived articles matching `query`, best match first.
+    Supports FTS5 syntax ("exact phrase", OR, NOT, prefix*); anything that
+    isn't valid syntax is searched as plain words.
+    Returns dicts with title, channel, url, video_id, timestamp, score and a snippet.
+    """
+    sql = f"""
+        SELECT d.title, d.channel, d.url, d.video_id, d.timestamp,
+               bm25(documents_fts, {", ".join(str(w) for w in _FIELD_WEIGHTS)}) AS score,
+               snippet(documents_fts, 2, '[', ']', '…', 12) AS snippet
+        FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+        WHERE documents_fts MATCH ?
+    """
+    params = []
+    if channel:
+        sql += " AND d.channel = ?"
+        params.append(channel)
+    sql += " ORDER BY score LIMIT ?"
+
+    conn = _connect()
+    try:
+        try:
+            rows = conn.execute(sql, [query] + params + [limit]).fetchall()
+        except sqlite3.OperationalError:
+            quoted = _quote_terms(query)
+            if not quoted:
+                return []
+            rows = conn.execute(sql, [quoted] + params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def count_indexed():
+    """
+    How many articles are in the index.
+    """
+    conn = _connect()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# Search from the command line
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search archived newsletter articles.")
+    parser.add_argument("query", help='words to find, e.g. battery life or "exact phrase"')
+    parser.add_argument("--channel", help="only articles from this channel")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = search(args.query, args.limit, args.channel)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{len(results)} result(s) from {count_indexed()} article(s) in {elapsed_ms:.1f} ms\n")
+    for result in results:
+        print(f"• {result['title']} ({result['channel']}) - digest {result['timestamp']}")
+        print(f"  {result['snippet']}")
+        if result["url"]:
+            print(f"  {result['url']}")
+        print()
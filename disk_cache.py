@@ -0,0 +1,168 @@
+"""
+Disk Cache: A small compressed key/value store on disk.
+Each entry is one gzip file in a folder. When the folder grows past its size
+limit, the least recently used entries are deleted first.
+Only uses the standard library, so helper scripts can import it too.
+"""
+
+import os
+import re
+import gzip
+import json
+import threading
+
+
+class DiskCache:
+    """
+    Gzip-compressed files in `directory`, bounded to `max_bytes` on disk.
+    Reading an entry bumps its modification time, which is what the
+    least-recently-used eviction goes by. Counts hits and misses.
+    """
+
+    def __init__(self, directory, max_bytes, suffix=".json.gz"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        # Keep file names safe no matter what the key contains
+        safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+        return os.path.join(self.directory, safe_key + self.suffix)
+
+    def get_any(self, keys):
+        """
+        Return the raw bytes of the first key that's cached, or None.
+        Counts as a single hit or miss.
+        """
+        for key in keys:
+            path = self._path(key)
+            try:
+                with gzip.open(path, "rb") as f:
+                    data = f.read()
+            except (OSError, EOFError):
+                continue
+
+            # Mark as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+            with self._lock:
+                self.hits += 1
+            return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get(self, key):
+        """
+        Return the raw bytes stored under `key`, or None.
+        """
+        return self.get_any([key])
+
+    def get_json(self, key):
+        data = self.get(key)
+        return json.loads(data) if data is not None else None
+
+    def put(self, key, data):
+        """
+        Store raw bytes under `key`, then evict old entries if we're over the limit.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+
+        # Write to a temp file and swap it in, so readers never see half an entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(data)
+        new_size = os.path.getsize(tmp_path)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._disk_usage()
+            else:
+                self._total_bytes += new_size - old_size
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def put_json(self, key, value):
+        self.put(key, json.dumps(value).encode("utf-8"))
+
+    def delete(self, key):
+        """
+        Remove one entry (if it exists).
+        """
+        path = self._path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._lock:
+            for entry in self._entries():
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            entry for entry in os.scandir(self.directory)
+            if entry.is_file() and entry.name.endswith(self.suffix)
+        ]
+
+    def _disk_usage(self):
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _evict(self):
+        """
+        Delete least recently used entries until we're back under the limit.
+        Must be called with the lock held.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+
+        self._total_bytes = total
+
+    def stats(self):
+        """
+        Hit/miss counts for this process, plus what's currently on disk.
+        """
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(entry.stat().st_size for entry in entries)
+        }
@@ -3,65 +3,164 @@ Part 2: Extract Transcripts from YouTube Videos
 This script takes video IDs and extracts the full transcript (captions).
 """
 
-import time
-from youtube_transcript_api import YouTubeTranscriptApi
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from youtube_transcript_api import YouTubeTranscriptApi, RequestBlocked, IpBlocked
+from http_session import create_session
+from metrics import external_call
+from rate_limit import TokenBucket
+from transcript import Transcript
+from transcript_cache import load_transcript, save_transcript, cache_stats
 
+# Preferred transcript languages, in order (comma-separated)
+TRANSCRIPT_LANGUAGES = [
+    lang.strip() for lang in os.getenv("TRANSCRIPT_LANGUAGES", "en").split(",") if lang.strip()
+]
 
-def get_transcript(video_id):
+# How many transcripts to download at the same time
+TRANSCRIPT_WORKERS = int(os.getenv("TRANSCRIPT_WORKERS", "4"))
+
+# Max transcript requests per second (slows down automatically if YouTube throttles us)
+TRANSCRIPT_RATE = float(os.getenv("TRANSCRIPT_RATE", "2"))
+
+# How many times to retry a video after being throttled
+TRANSCRIPT_RETRIES = int(os.getenv("TRANSCRIPT_RETRIES", "3"))
+
+# Shared by every worker, so the rate applies to the whole pipeline
+transcript_limiter = TokenBucket(TRANSCRIPT_RATE)
+
+# Each thread keeps its own transcript API (the library isn't thread-safe)
+_thread_local = threading.local()
+
+
+def get_transcript_api():
+    """
+    Get a YouTubeTranscriptApi for the current thread, created once and reused
+    so its pooled keep-alive session survives between videos.
+    """
+    ytt_api = getattr(_thread_local, "ytt_api", None)
+    if ytt_api is None:
+        ytt_api = YouTubeTranscriptApi(http_client=create_session())
+        _thread_local.ytt_api = ytt_api
+    return ytt_api
+
+
+def _http_status(error):
+    """
+    The HTTP status code behind an error, or None. Also looks at the error it
+    was raised from (YouTubeRequestFailed wraps the original HTTPError that way).
+    """
+    for _ in range(5):
+        if error is None:
+            break
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is not None:
+            return status
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def is_throttling_error(error):
+    """
+    Check if an error means YouTube wants us to slow down: it blocked the
+    request, or answered 429 Too Many Requests.
+    """
+    if isinstance(error, (RequestBlocked, IpBlocked)):
+        return True
+    return _http_status(error) == 429
+
+
+def fetch_transcript(video_id, limiter=None):
+    """
+    Download a transcript, waiting for the rate limiter before each attempt.
+    Throttled attempts slow the limiter down and are retried; other errors
+    are raised straight away.
+    """
+    if limiter is None:
+        limiter = transcript_limiter
+
+    for attempt in range(TRANSCRIPT_RETRIES + 1):
+        limiter.acquire()
+        try:
+            # Reuse this thread's API instance (newer version syntax)
+            with external_call("youtube.transcript") as call:
+                transcript_list = get_transcript_api().fetch(video_id, languages=TRANSCRIPT_LANGUAGES)
+                call["bytes"] = sum(len(segment.text.encode("utf-8")) for segment in transcript_list)
+        except Exception as e:
+            if not is_throttling_error(e) or attempt == TRANSCRIPT_RETRIES:
+                raise
+            limiter.backoff()
+            continue
+
+        limiter.recover()
+        return transcript_list
+
+
+def get_transcript(video_id, limiter=None):
     """
     Get the transcript for a YouTube video.
-    Returns the full text of everything said in the video.
+    Returns a Transcript: the full text of everything said in the video
+    (transcript.text), plus when each part was said.
+    Checks the transcript cache first, so a video is only downloaded once.
     """
-    try:
-        # Create an instance of the API (newer version syntax)
-        ytt_api = YouTubeTranscriptApi()
+    cached = load_transcript(video_id, TRANSCRIPT_LANGUAGES)
+    if cached:
+        return Transcript.from_dict(cached)
 
+    try:
         # Fetch the transcript
-        transcript_list = ytt_api.fetch(video_id)
+        transcript_list = fetch_transcript(video_id, limiter)
 
         # The transcript comes as a list of segments with timestamps
-        # We combine them into one clean text
-        full_text = ""
-        for segment in transcript_list:
-            full_text += segment.text + " "
+        # We combine them into one clean text, keeping the timestamps
+        transcript = Transcript.from_segments(transcript_list, transcript_list.language_code)
 
-        return full_text.strip()
+        save_transcript(video_id, transcript)
+        return transcript
 
     except Exception as e:
-        print(f"  ⚠ Error getting transcript: {e}")
+        print(f"  ⚠ Error getting transcript for {video_id}: {e}")
         return None
 
 
-def get_transcripts_for_videos(videos):
+def get_transcripts_for_videos(videos, workers=None):
     """
     Get transcripts for a list of videos.
     Takes the video list from get_videos.py and adds transcripts.
+    Several videos are downloaded at once, paced by the shared rate limiter;
+    results come back in the same order as the input.
     """
+    if workers is None:
+        workers = TRANSCRIPT_WORKERS
+    workers = max(1, min(workers, len(videos) or 1))
+
     print("\nExtracting transcripts...\n")
     print("=" * 60)
 
-    for i, video in enumerate(videos):
-        print(f"Getting transcript: {video['title'][:50]}...")
-
-        transcript = get_transcript(video["video_id"])
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        transcripts = executor.map(lambda video: get_transcript(video["video_id"]), videos)
 
-        if transcript:
-            video["transcript"] = transcript
-            word_count = len(transcript.split())
-            print(f"  ✓ Got {word_count} words\n")
-        else:
-            video["transcript"] = None
-            print(f"  ✗ No transcript available\n")
+        for video, transcript in zip(videos, transcripts):
+            print(f"Getting transcript: {video['title'][:50]}...")
 
-        # Small delay between requests to avoid rate limiting
-        if i < len(videos) - 1:
-            time.sleep(2)
+            if transcript:
+                # write_article uses the plain text; the timing is kept for deep links
+                video["transcript"] = transcript.text
+                video["timed_transcript"] = transcript
+                word_count = len(transcript.text.split())
+                print(f"  ✓ Got {word_count} words\n")
+            else:
+                video["transcript"] = None
+                print(f"  ✗ No transcript available\n")
 
     # Filter out videos without transcripts
     videos_with_transcripts = [v for v in videos if v.get("transcript")]
 
+    stats = cache_stats()
     print("=" * 60)
     print(f"Got transcripts for {len(videos_with_transcripts)} of {len(videos)} videos")
+    print(f"  (transcript cache: {stats['hits']} hits, {stats['misses']} misses)")
 
     return videos_with_transcripts
 
@@ -73,4 +172,4 @@ if __name__ == "__main__":
     print("Testing transcript extraction...")
     transcript = get_transcript(test_video_id)
     if transcript:
-        print(f"Got transcript! First 200 chars:\n{transcript[:200]}...")
+        print(f"Got transcript! First 200 chars:\n{transcript.text[:200]}...")
@@ -1,18 +1,66 @@
 """
 Part 1: Fetch Latest Videos from YouTube Channels
 This script gets the most recent video from each of your favorite channels.
-Filters out YouTube Shorts by checking the /shorts/ URL.
+Filters out YouTube Shorts by looking up video durations in bulk, and
+checking the /shorts/ URL only for videos short enough to be a Short.
+API quota is budgeted per day (see quota_ledger.py): channels are checked
+in order of priority and how recently they posted, and once the budget is
+used up the rest are skipped until it resets.
 """
 
 import os
-import requests
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
 from dotenv import load_dotenv
+from http_session import get_session
+from metrics import external_call, record_quota
+from quota_ledger import (
+    QuotaExhausted, spend, reserve, spent_today, last_posted, record_last_posted,
+    save_ledger, YOUTUBE_DAILY_QUOTA
+)
+from youtube_cache import (
+    get_cached_channel, cache_channel, save_channel_cache,
+    get_cached_short_verdict, cache_short_verdict, save_shorts_cache
+)
 
 # Load your secret API key from the .env file
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
+# How many channels to look up at the same time (1 = one after another)
+CHANNEL_CONCURRENCY = int(os.getenv("CHANNEL_CONCURRENCY", "8"))
+
+# Shorts can be up to 3 minutes long - anything longer is definitely long-form
+SHORTS_MAX_SECONDS = 180
+
+# The videos().list API accepts up to 50 IDs per call
+VIDEOS_PER_LOOKUP = 50
+
+# Set to 1 to ignore the channel cache and look every handle up again
+REFRESH_CHANNEL_CACHE = os.getenv("REFRESH_CHANNEL_CACHE") == "1"
+
+# Quota cost of each YouTube Data API call we make (every list call costs 1 unit)
+QUOTA_COSTS = {
+    "channels.list": 1,
+    "playlistItems.list": 1,
+    "videos.list": 1
+}
+
+# Which channels to check first when quota is tight, e.g. "@mkbhd=3,@veritasium=2"
+# (channels not listed have priority 1)
+CHANNEL_PRIORITIES = {
+    handle.strip().lstrip("@").lower(): float(priority)
+    for handle, _, priority in (
+        entry.partition("=") for entry in os.getenv("CHANNEL_PRIORITIES", "").split(",")
+    )
+    if handle.strip() and priority.strip()
+}
+
 # ========================================
 # YOUR FAVORITE CHANNELS GO HERE
 # Use the @ handle from the channel's YouTube page (most reliable)
@@ -26,11 +74,30 @@ CHANNELS = [
 ]
 
 
-def get_channel_info(youtube, channel_handle):
+def execute_request(method, request):
+    """
+    Run a YouTube Data API request, recording its quota cost, time and size.
+    The cost is charged to today's budget first; raises QuotaExhausted if it doesn't fit.
+    """
+    spend(QUOTA_COSTS[method], method)
+    record_quota(method, QUOTA_COSTS[method])
+    with external_call(f"youtube.{method}") as call:
+        response = request.execute()
+        call["bytes"] = len(json.dumps(response))
+    return response
+
+
+def get_channel_info(youtube, channel_handle, refresh=False):
     """
     Given a channel handle (@username), find its channel ID and uploads playlist ID.
     The uploads playlist contains ALL videos in exact upload order (most reliable).
+    Known handles come from the channel cache (no API call) unless refresh=True.
     """
+    if not refresh:
+        cached = get_cached_channel(channel_handle)
+        if cached:
+            return cached
+
     # Remove @ if present for the API call
     handle = channel_handle.lstrip("@")
 
@@ -39,43 +106,115 @@ def get_channel_info(youtube, channel_handle):
         part="snippet,contentDetails",
         forHandle=handle
     )
-    response = request.execute()
+    response = execute_request("channels.list", request)
 
     if response.get("items"):
         channel = response["items"][0]
-        return {
+        channel_info = {
             "channel_id": channel["id"],
             "channel_name": channel["snippet"]["title"],
             "uploads_playlist_id": channel["contentDetails"]["relatedPlaylists"]["uploads"]
         }
+        cache_channel(channel_handle, channel_info)
+        return channel_info
 
     return None
 
 
-def is_youtube_short(video_id):
+def _probe_short(video_id):
     """
     Check if a video is a YouTube Short by testing the /shorts/ URL.
     If youtube.com/shorts/VIDEO_ID works (doesn't redirect away), it's a Short.
+    Returns None if the check itself failed.
     """
     shorts_url = f"https://www.youtube.com/shorts/{video_id}"
 
     try:
-        # Make a request and check if we stay on the /shorts/ URL
-        response = requests.head(shorts_url, allow_redirects=True, timeout=5)
+        # Make a request (over a pooled keep-alive connection) and check if we stay on the /shorts/ URL
+        with external_call("youtube.shorts_probe"):
+            response = get_session().head(shorts_url, allow_redirects=True)
         final_url = response.url
 
         # If the final URL still contains /shorts/, it's a Short
         return "/shorts/" in final_url
-    except:
-        # If there's an error, assume it's not a Short
+    except Exception:
+        return None
+
+
+def is_youtube_short(video_id):
+    """
+    Check if a video is a YouTube Short (cached verdict, else the /shorts/ URL test).
+    """
+    cached = get_cached_short_verdict(video_id)
+    if cached is not None:
+        return cached
+
+    verdict = _probe_short(video_id)
+    if verdict is None:
+        # If there's an error, assume it's not a Short (and don't remember it)
         return False
 
+    cache_short_verdict(video_id, verdict)
+    return verdict
 
-def get_latest_video(youtube, uploads_playlist_id, channel_name):
+
+def parse_duration(duration):
+    """
+    Convert a YouTube ISO 8601 duration like "PT1H2M3S" into seconds.
+    """
+    match = re.fullmatch(
+        r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?",
+        duration or ""
+    )
+    if not match:
+        return 0
+
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def classify_shorts(youtube, video_ids):
+    """
+    Work out which videos are Shorts without probing them one by one.
+    Uses cached verdicts first, then looks up durations for the rest,
+    50 videos per videos().list call (1 quota unit each).
+    Returns {video_id: True/False}. Videos that are short enough to be a
+    Short are left out - only the /shorts/ URL test can tell those apart.
+    """
+    verdicts = {}
+    unknown = []
+
+    for video_id in video_ids:
+        cached = get_cached_short_verdict(video_id)
+        if cached is None:
+            unknown.append(video_id)
+        else:
+            verdicts[video_id] = cached
+
+    for start in range(0, len(unknown), VIDEOS_PER_LOOKUP):
+        batch = unknown[start:start + VIDEOS_PER_LOOKUP]
+        request = youtube.videos().list(
+            part="contentDetails",
+            id=",".join(batch)
+        )
+        response = execute_request("videos.list", request)
+
+        for item in response.get("items", []):
+            seconds = parse_duration(item["contentDetails"].get("duration"))
+            if seconds > SHORTS_MAX_SECONDS:
+                verdicts[item["id"]] = False
+                cache_short_verdict(item["id"], False)
+
+    return verdicts
+
+
+def get_latest_video(youtube, uploads_playlist_id, channel_name, lines=None):
     """
     Get the most recent LONG-FORM video from a channel's uploads playlist.
     Uses the uploads playlist (not search) for accurate chronological order.
-    Skips YouTube Shorts by checking the /shorts/ URL pattern.
+    Skips YouTube Shorts: durations are looked up in one batch, and only
+    videos under 3 minutes fall back to the /shorts/ URL check.
+    Warnings are added to `lines` (progress lines to print) if given.
     """
     # Get the 15 most recent videos from the uploads playlist
     # The uploads playlist is always in exact upload order (newest first)
@@ -84,13 +223,27 @@ def get_latest_video(youtube, uploads_playlist_id, channel_name):
         playlistId=uploads_playlist_id,
         maxResults=15
     )
-    response = request.execute()
+    response = execute_request("playlistItems.list", request)
+    items = response.get("items", [])
+
+    # Classify all candidates at once (falls back to URL checks if the API call fails;
+    # running out of quota is left to the caller, which skips the channel)
+    video_ids = [item["snippet"]["resourceId"]["videoId"] for item in items]
+    try:
+        verdicts = classify_shorts(youtube, video_ids)
+    except (HttpError, HttpLib2Error, OSError) as e:
+        if lines is not None:
+            lines.append(f"  ⚠ Duration lookup failed, checking /shorts/ URLs instead: {e}")
+        verdicts = {}
 
-    for item in response.get("items", []):
+    for item in items:
         video_id = item["snippet"]["resourceId"]["videoId"]
 
         # Check if this video is a Short
-        if is_youtube_short(video_id):
+        is_short = verdicts.get(video_id)
+        if is_short is None:
+            is_short = is_youtube_short(video_id)
+        if is_short:
             continue  # Skip Shorts, check the next video
 
         # It's a long-form video!
@@ -99,55 +252,196 @@ def get_latest_video(youtube, uploads_playlist_id, channel_name):
             "video_id": video_id,
             "description": item["snippet"]["description"],
             "channel": channel_name,
-            "url": f"https://www.youtube.com/watch?v={video_id}"
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+            "published_at": item["snippet"].get("publishedAt")
         }
 
     return None
 
 
-def main():
+# Each worker thread keeps its own YouTube client here
+_thread_local = threading.local()
+
+
+def get_youtube_client():
     """
-    Main function - this runs when you execute the script.
+    Get a YouTube API connection for the current thread.
+    The underlying HTTP connection isn't thread-safe, so each worker
+    thread builds (and then reuses) its own client.
     """
-    # Create a connection to YouTube
-    youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+    youtube = getattr(_thread_local, "youtube", None)
+    if youtube is None:
+        youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+        _thread_local.youtube = youtube
+    return youtube
 
-    print("Fetching latest LONG-FORM videos (skipping Shorts)...\n")
-    print("=" * 60)
 
-    videos = []
+def estimated_channel_cost(channel_handle, refresh=False):
+    """
+    Quota units one channel will probably need: a playlist lookup and a
+    durations lookup, plus a channel lookup if it isn't cached.
+    """
+    cost = QUOTA_COSTS["playlistItems.list"] + QUOTA_COSTS["videos.list"]
+    if refresh or not get_cached_channel(channel_handle):
+        cost += QUOTA_COSTS["channels.list"]
+    return cost
+
+
+def schedule_channels(channels):
+    """
+    The order to check channels in (as positions in `channels`): highest
+    CHANNEL_PRIORITIES first, then the ones that posted most recently.
+    Channels we've never seen count as recent. Only matters when the
+    quota budget can't cover every channel.
+    """
+    def recency(index):
+        # ISO 8601 timestamps sort by time; "~" sorts after every date
+        return last_posted(channels[index]) or "~"
+
+    def priority(index):
+        return CHANNEL_PRIORITIES.get(channels[index].lstrip("@").lower(), 1.0)
+
+    order = sorted(range(len(channels)), key=recency, reverse=True)
+    return sorted(order, key=priority, reverse=True)
+
+
+def process_channel(channel_handle, refresh=False):
+    """
+    Look up one channel and find its latest long-form video.
+    Returns (video or None, list of progress lines to print).
+    Errors are caught here so one broken channel can't stop the others.
+    """
+    lines = [f"Looking up: {channel_handle}"]
+
+    try:
+        # Don't start a channel we can't finish: its quota is set aside before
+        # the first call (unused units are given back when it's done)
+        with reserve(estimated_channel_cost(channel_handle, refresh), channel_handle):
+            youtube = get_youtube_client()
 
-    for channel_handle in CHANNELS:
-        print(f"Looking up: {channel_handle}")
+            # Step 1: Get channel info (including uploads playlist)
+            channel_info = get_channel_info(youtube, channel_handle, refresh=refresh)
 
-        # Step 1: Get channel info (including uploads playlist)
-        channel_info = get_channel_info(youtube, channel_handle)
+            if not channel_info:
+                lines.append("  ✗ Channel not found\n")
+                return None, lines
 
-        if channel_info:
-            print(f"  Channel: {channel_info['channel_name']}")
+            lines.append(f"  Channel: {channel_info['channel_name']}")
 
             # Step 2: Get latest video from uploads playlist
             video = get_latest_video(
                 youtube,
                 channel_info["uploads_playlist_id"],
-                channel_info["channel_name"]
+                channel_info["channel_name"],
+                lines
             )
 
             if video:
-                videos.append(video)
-                print(f"  ✓ Found: {video['title']}")
-                print(f"    URL: {video['url']}\n")
+                record_last_posted(channel_handle, video["published_at"])
+                lines.append(f"  ✓ Found: {video['title']}")
+                lines.append(f"    URL: {video['url']}\n")
             else:
-                print(f"  ✗ No long-form videos found\n")
-        else:
-            print(f"  ✗ Channel not found\n")
+                lines.append("  ✗ No long-form videos found\n")
+
+            return video, lines
+
+    except QuotaExhausted as e:
+        lines.append(f"  ⏸ Skipped - daily YouTube quota used up ({e})\n")
+        return None, lines
+
+    except Exception as e:
+        lines.append(f"  ✗ Error: {e}\n")
+        return None, lines
+
+
+def main(concurrency=None, refresh_channels=None):
+    """
+    Main function - this runs when you execute the script.
+    Channels are looked up in parallel (up to `concurrency` at a time),
+    started in schedule_channels() order, but results are always returned
+    in the same order as CHANNELS.
+    Pass refresh_channels=True to bypass the channel cache.
+    """
+    if concurrency is None:
+        concurrency = CHANNEL_CONCURRENCY
+    if refresh_channels is None:
+        refresh_channels = REFRESH_CHANNEL_CACHE
+    concurrency = max(1, min(concurrency, len(CHANNELS) or 1))
+
+    print("Fetching latest LONG-FORM videos (skipping Shorts)...\n")
+    print(f"YouTube quota today: {spent_today()}/{YOUTUBE_DAILY_QUOTA} units used\n")
+    print("=" * 60)
+
+    order = schedule_channels(CHANNELS)
+
+    def lookup(index):
+        return index, process_channel(CHANNELS[index], refresh=refresh_channels)
+
+    try:
+        if concurrency == 1:
+            return _collect_videos(map(lookup, order))
+
+        print(f"Looking up {len(CHANNELS)} channels ({concurrency} at a time)...\n")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Channels start in schedule order; _collect_videos puts them back in CHANNELS order
+            return _collect_videos(executor.map(lookup, order))
+    finally:
+        # Remember any newly resolved channels and Shorts verdicts for next time
+        save_channel_cache()
+        save_shorts_cache()
+        save_ledger()
+
+
+def iter_channel_videos(concurrency=None, refresh_channels=None):
+    """
+    Like main(), but yields (index in CHANNELS, video or None, progress lines)
+    for each channel as soon as it's done, in whatever order they finish.
+    Used by the pipelined mode so later steps can start right away.
+    """
+    if concurrency is None:
+        concurrency = CHANNEL_CONCURRENCY
+    if refresh_channels is None:
+        refresh_channels = REFRESH_CHANNEL_CACHE
+    concurrency = max(1, min(concurrency, len(CHANNELS) or 1))
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(process_channel, CHANNELS[index], refresh_channels): index
+                for index in schedule_channels(CHANNELS)
+            }
+            for future in as_completed(futures):
+                video, lines = future.result()
+                yield futures[future], video, lines
+    finally:
+        save_channel_cache()
+        save_shorts_cache()
+        save_ledger()
+
+
+def _collect_videos(results):
+    """
+    Print each channel's progress lines and gather the videos found,
+    in CHANNELS order. `results` are (index in CHANNELS, (video, lines)) pairs.
+    """
+    found = []
+
+    for index, (video, lines) in results:
+        for line in lines:
+            print(line)
+        if video:
+            found.append((index, video))
+
+    videos = [video for _, video in sorted(found, key=lambda pair: pair[0])]
 
     print("=" * 60)
     print(f"Found {len(videos)} videos total!")
+    print(f"YouTube quota today: {spent_today()}/{YOUTUBE_DAILY_QUOTA} units used")
 
     return videos
 
 
 # This runs the main function when you execute the script
 if __name__ == "__main__":
-    main()
+    import sys
+    main(refresh_channels="--refresh-channels" in sys.argv or None)
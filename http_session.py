@@ -0,0 +1,73 @@
+"""
+HTTP Sessions: Shared, keep-alive connections for every web request we make.
+Opening a fresh connection costs a TCP + TLS handshake each time, so instead
+we reuse pooled requests.Session objects with sensible timeouts and retries.
+"""
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# How many keep-alive connections to keep open per host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+# Seconds to wait for a connection / for a response
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+
+# Retry connection errors and server hiccups (not 429s - callers handle those)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+
+_lock = threading.Lock()
+_shared_session = None
+
+
+class _TimeoutAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter that applies our default timeout to every request,
+    unless the caller passes one explicitly.
+    """
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        return super().send(request, **kwargs)
+
+
+def create_session():
+    """
+    Build a new pooled session with our timeout and retry policy.
+    Use this when a library needs its own session (e.g. one per thread).
+    """
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=("HEAD", "GET", "OPTIONS"),
+        raise_on_status=False
+    )
+    adapter = _TimeoutAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Get the session shared by the whole pipeline (created on first use).
+    Safe to use from several threads for simple requests like HEAD checks.
+    """
+    global _shared_session
+    with _lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
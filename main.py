@@ -2,54 +2,155 @@
 YouTube Newsletter Generator - Main Script
 Ties together all the pieces: fetch videos → get transcripts → write articles → send email
 Tracks processed videos to avoid sending duplicates.
+Each step is checkpointed, so a failed run can be resumed with --resume.
+Each step is also timed (see metrics.py), with a report saved per run.
 """
 
+import argparse
+import metrics
 from get_videos import main as fetch_videos
 from get_transcripts import get_transcripts_for_videos
 from write_articles import write_articles_for_videos
 from send_email import send_newsletter
 from video_tracker import filter_new_videos, mark_videos_processed, get_processed_count
+from transcript import Transcript
+from pipeline import run_pipeline
+from run_checkpoints import (
+    new_run, latest_unfinished_run, load_state, save_stage, load_stage, mark_complete
+)
 
 
-def run():
+def run(resume=None, pipelined=False):
     """
     Run the full newsletter pipeline.
+    Pass resume=True to continue the latest unfinished run (or a run ID to
+    continue that run): finished steps are loaded from the checkpoint, and
+    only videos that didn't get through a step last time are retried.
+    Pass pipelined=True to run steps 1-3 overlapping (see pipeline.py).
     """
+    metrics.reset()
+    try:
+        return _run(resume, pipelined)
+    finally:
+        report = metrics.write_report()
+        metrics.print_summary(report)
+
+
+def _run(resume, pipelined):
     print("=" * 60)
     print("  YOUTUBE NEWSLETTER GENERATOR")
     print("=" * 60)
     print(f"  Previously processed: {get_processed_count()} videos")
 
-    # Step 1: Fetch latest videos from your channels
-    print("\n📺 STEP 1: Fetching latest videos...\n")
-    videos = fetch_videos()
-
-    if not videos:
-        print("No videos found. Check your channel list.")
-        return
+    run_id = None
+    if resume:
+        run_id = latest_unfinished_run() if resume is True else resume
+        state = load_state(run_id) if run_id else None
+
+        if not state:
+            print("  Nothing to resume - starting a new run.")
+            run_id = None
+        elif state.get("completed"):
+            print(f"  Run {run_id} already completed - nothing to resume.")
+            return
+        elif state.get("superseded_by"):
+            print(f"  Run {run_id} was superseded by run {state['superseded_by']} - nothing to resume.")
+            return
+        else:
+            print(f"  Resuming run {run_id}")
+
+    if run_id is None:
+        run_id = new_run()
+        print(f"  Run ID: {run_id}")
+
+    metrics.set_run_id(run_id)
+
+    # Steps 1-3 overlapping: checkpoint everything once they're all done
+    if pipelined and load_stage(run_id, "videos") is None:
+        print("\n🚀 STEPS 1-3: Fetching videos, transcripts and articles (pipelined)...\n")
+        with metrics.stage("pipeline"):
+            new_videos, videos_with_transcripts, articles = run_pipeline()
+        save_stage(run_id, "videos", [
+            {key: value for key, value in video.items() if key not in ("transcript", "timed_transcript")}
+            for video in new_videos
+        ])
+        save_stage(run_id, "transcripts", {
+            video["video_id"]: video["timed_transcript"].to_dict() for video in videos_with_transcripts
+        })
+        save_stage(run_id, "articles", {article["video_id"]: article for article in articles})
 
-    # Step 1b: Filter out already-processed videos
-    print("\n🔍 Checking for new videos...\n")
-    new_videos = filter_new_videos(videos)
+    # Step 1: Fetch latest videos from your channels
+    new_videos = load_stage(run_id, "videos")
+
+    if new_videos is None:
+        print("\n📺 STEP 1: Fetching latest videos...\n")
+        with metrics.stage("fetch_videos"):
+            videos = fetch_videos()
+
+        if not videos:
+            print("No videos found. Check your channel list.")
+            return
+
+        # Step 1b: Filter out already-processed videos
+        print("\n🔍 Checking for new videos...\n")
+        new_videos = filter_new_videos(videos)
+        save_stage(run_id, "videos", new_videos)
+    else:
+        print(f"\n📺 STEP 1: ↺ {len(new_videos)} new video(s) loaded from checkpoint\n")
+        # Another run may have sent some of them since this run was checkpointed
+        new_videos = filter_new_videos(new_videos)
 
     if not new_videos:
         print("No new videos to process. All videos have been sent before.")
         print("=" * 60)
+        mark_complete(run_id)
         return
 
     print(f"\n  → {len(new_videos)} new video(s) to process\n")
 
-    # Step 2: Get transcripts for those videos
+    # Step 2: Get transcripts for those videos (only the ones we don't have yet)
     print("\n📝 STEP 2: Extracting transcripts...\n")
-    videos_with_transcripts = get_transcripts_for_videos(new_videos)
+    transcripts = load_stage(run_id, "transcripts") or {}
+    pending = [v for v in new_videos if v["video_id"] not in transcripts]
+
+    if len(pending) < len(new_videos):
+        print(f"  ↺ {len(new_videos) - len(pending)} transcript(s) loaded from checkpoint")
+
+    if pending:
+        with metrics.stage("get_transcripts_for_videos"):
+            fetched = get_transcripts_for_videos(pending)
+        for video in fetched:
+            transcripts[video["video_id"]] = video["timed_transcript"].to_dict()
+        save_stage(run_id, "transcripts", transcripts)
+
+    videos_with_transcripts = []
+    for video in new_videos:
+        if video["video_id"] in transcripts:
+            transcript = Transcript.from_dict(transcripts[video["video_id"]])
+            videos_with_transcripts.append(dict(
+                video, transcript=transcript.text, timed_transcript=transcript
+            ))
 
     if not videos_with_transcripts:
         print("No transcripts available for any videos.")
         return
 
-    # Step 3: Generate articles using Claude AI
+    # Step 3: Generate articles using Claude AI (only the ones we don't have yet)
     print("\n✍️ STEP 3: Writing articles with Claude AI...\n")
-    articles = write_articles_for_videos(videos_with_transcripts)
+    written = load_stage(run_id, "articles") or {}
+    pending = [v for v in videos_with_transcripts if v["video_id"] not in written]
+
+    if len(pending) < len(videos_with_transcripts):
+        print(f"  ↺ {len(videos_with_transcripts) - len(pending)} article(s) loaded from checkpoint")
+
+    if pending:
+        with metrics.stage("write_articles_for_videos"):
+            new_articles = write_articles_for_videos(pending)
+        for article in new_articles:
+            written[article["video_id"]] = article
+        save_stage(run_id, "articles", written)
+
+    articles = [written[v["video_id"]] for v in videos_with_transcripts if v["video_id"] in written]
 
     if not articles:
         print("No articles generated.")
@@ -57,12 +158,16 @@ def run():
 
     # Step 4: Send the newsletter via email
     print("\n📧 STEP 4: Sending newsletter...\n")
-    success = send_newsletter(articles)
+    with metrics.stage("send_newsletter"):
+        success = send_newsletter(articles)
 
     # Step 5: Mark videos as processed (only if email sent successfully)
     if success:
         mark_videos_processed(videos_with_transcripts)
         print(f"\n  ✓ Marked {len(videos_with_transcripts)} video(s) as processed")
+        mark_complete(run_id)
+    else:
+        print(f"\n  Run {run_id} saved - retry with: python main.py --resume {run_id}")
 
     print("\n" + "=" * 60)
     print("  DONE!")
@@ -72,4 +177,15 @@ def run():
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Generate the YouTube newsletter.")
+    parser.add_argument(
+        "--resume", nargs="?", const=True, metavar="RUN_ID",
+        help="continue the latest unfinished run (or the given run ID)"
+    )
+    parser.add_argument(
+        "--pipelined", action="store_true",
+        help="overlap steps 1-3: each video moves on as soon as it's ready"
+    )
+    args = parser.parse_args()
+
+    run(resume=args.resume, pipelined=args.pipelined)
@@ -0,0 +1,218 @@
+"""
+Metrics: Measures where each run spends its time, bytes, tokens and quota.
+Every pipeline step is timed, and every call to an outside service
+(YouTube, the transcript site, Claude, the mail server) is counted with its
+duration, errors and bytes. Claude token usage and YouTube API quota units
+are added up too. At the end of a run everything is written as:
+  - runs/<run_id>/metrics.json   (a JSON report for that run)
+  - metrics.prom                 (Prometheus text format, e.g. for node_exporter)
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from run_checkpoints import RUNS_DIR
+from storage import write_atomic, write_json_atomic
+
+# Prometheus textfile to (over)write after each run ("" to turn it off)
+METRICS_TEXTFILE = os.getenv(
+    "METRICS_TEXTFILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.prom")
+)
+
+# Every Prometheus metric name starts with this
+_PREFIX = "youtube_newsletter"
+
+_lock = threading.Lock()
+_state = {}
+
+
+def reset(run_id=None):
+    """
+    Start measuring a new run.
+    """
+    with _lock:
+        _state.clear()
+        _state.update({
+            "run_id": run_id,
+            "started_at": datetime.now().isoformat(),
+            "started": time.time(),
+            "stages": {},
+            "calls": {},
+            "tokens": {
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cache_read_input_tokens": 0,
+                "cache_creation_input_tokens": 0
+            },
+            "youtube_quota": {}
+        })
+
+
+def set_run_id(run_id):
+    with _lock:
+        _state["run_id"] = run_id
+
+
+@contextmanager
+def stage(name):
+    """
+    Time one pipeline step:
+        with metrics.stage("fetch_videos"):
+            ...
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        with _lock:
+            entry = _state["stages"].setdefault(name, {"seconds": 0.0, "runs": 0})
+            entry["seconds"] += seconds
+            entry["runs"] += 1
+
+
+@contextmanager
+def external_call(name):
+    """
+    Count and time one call to an outside service. Set call["bytes"] inside
+    the block to record how much was sent or received:
+        with metrics.external_call("anthropic.messages") as call:
+            ...
+            call["bytes"] = len(text)
+    """
+    call = {"bytes": 0}
+    failed = False
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        with _lock:
+            entry = _state["calls"].setdefault(
+                name, {"requests": 0, "errors": 0, "seconds": 0.0, "bytes": 0}
+            )
+            entry["requests"] += 1
+            entry["errors"] += int(failed)
+            entry["seconds"] += seconds
+            entry["bytes"] += call["bytes"]
+
+
+def record_tokens(usage):
+    """
+    Add one Claude response's token counts (the dict from record_usage()).
+    """
+    with _lock:
+        for key in _state["tokens"]:
+            _state["tokens"][key] += usage.get(key, 0)
+
+
+def record_quota(method, units):
+    """
+    Add YouTube Data API quota units spent on `method` (e.g. "channels.list").
+    """
+    with _lock:
+        quota = _state["youtube_quota"]
+        quota[method] = quota.get(method, 0) + units
+
+
+def snapshot():
+    """
+    Everything measured so far, as a JSON-friendly dict.
+    """
+    with _lock:
+        report = json.loads(json.dumps({
+            key: value for key, value in _state.items() if key != "started"
+        }))
+        report["seconds"] = round(time.time() - _state["started"], 3)
+
+    report["finished_at"] = datetime.now().isoformat()
+    report["youtube_quota_total"] = sum(report["youtube_quota"].values())
+    for entries in (report["stages"], report["calls"]):
+        for entry in entries.values():
+            entry["seconds"] = round(entry["seconds"], 3)
+    return report
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(report):
+    """
+    Format a report in the Prometheus text exposition format.
+    """
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {_PREFIX}_{name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f"{_PREFIX}_{name}{{{label_text}}} {value}" if label_text
+                         else f"{_PREFIX}_{name} {value}")
+
+    stages = report["stages"].items()
+    calls = report["calls"].items()
+
+    metric("run_seconds", "gauge", "Wall time of the last run.", [({}, report["seconds"])])
+    metric("run_timestamp_seconds", "gauge", "When the last run finished (Unix time).",
+           [({}, round(time.time(), 3))])
+    metric("stage_seconds", "gauge", "Wall time per pipeline step in the last run.",
+           [({"stage": name}, entry["seconds"]) for name, entry in stages])
+    metric("external_requests", "gauge", "Calls to outside services in the last run.",
+           [({"call": name}, entry["requests"]) for name, entry in calls])
+    metric("external_errors", "gauge", "Failed calls to outside services in the last run.",
+           [({"call": name}, entry["errors"]) for name, entry in calls])
+    metric("external_seconds", "gauge", "Time spent waiting on outside services in the last run.",
+           [({"call": name}, entry["seconds"]) for name, entry in calls])
+    metric("external_bytes", "gauge", "Bytes sent to or received from outside services in the last run.",
+           [({"call": name}, entry["bytes"]) for name, entry in calls])
+    metric("anthropic_tokens", "gauge", "Claude tokens used in the last run.",
+           [({"type": key.replace("_tokens", "")}, value) for key, value in report["tokens"].items()])
+    metric("youtube_quota_units", "gauge", "YouTube Data API quota units spent in the last run.",
+           [({"method": method}, units) for method, units in report["youtube_quota"].items()])
+
+    return "\n".join(lines) + "\n"
+
+
+def write_report():
+    """
+    Save the run report (JSON in the run's folder) and the Prometheus textfile.
+    Returns the report.
+    """
+    report = snapshot()
+
+    if report.get("run_id"):
+        run_dir = os.path.join(RUNS_DIR, report["run_id"])
+        if os.path.isdir(run_dir):
+            write_json_atomic(os.path.join(run_dir, "metrics.json"), report)
+
+    if METRICS_TEXTFILE:
+        write_atomic(METRICS_TEXTFILE, prometheus_text(report))
+
+    return report
+
+
+def print_summary(report):
+    """
+    Print a short breakdown of where the run's time went.
+    """
+    print(f"\n📊 Run took {report['seconds']:.1f}s")
+    for name, entry in report["stages"].items():
+        print(f"  {name}: {entry['seconds']:.1f}s")
+    for name, entry in sorted(report["calls"].items()):
+        errors = f", {entry['errors']} failed" if entry["errors"] else ""
+        print(f"  · {name}: {entry['requests']} call(s){errors}, {entry['seconds']:.1f}s, "
+              f"{entry['bytes'] / 1024:.0f} KB")
+    if report["youtube_quota_total"]:
+        print(f"  YouTube quota used: {report['youtube_quota_total']} units")
+
+
+# Measuring starts as soon as the module is imported (main.py resets it per run)
+reset()
@@ -0,0 +1,221 @@
+"""
+Newsletter Templates: The HTML for the email and the EPUB chapters.
+Templates and styles are built once when the program starts; each send only
+fills in the blanks. Pieces are collected in a list and joined at the end
+(instead of growing one big string), and video titles, channel names and
+links are escaped so odd characters can't break the HTML.
+"""
+
+from html import escape
+from string import Template
+
+# Styles for the email newsletter (larger fonts for better readability)
+NEWSLETTER_CSS = """
+        body {
+            font-family: Georgia, serif;
+            font-size: 18px;
+            max-width: 700px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f9f9f9;
+            color: #333;
+        }
+        .header {
+            text-align: center;
+            padding: 30px 0;
+            border-bottom: 3px solid #333;
+            margin-bottom: 30px;
+        }
+        .header h1 {
+            margin: 0;
+            font-size: 32px;
+            letter-spacing: 2px;
+        }
+        .header p {
+            color: #666;
+            font-size: 18px;
+            margin: 10px 0 0 0;
+        }
+        .article {
+            background: white;
+            padding: 30px;
+            margin-bottom: 30px;
+            border-radius: 5px;
+            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+        }
+        .article-intro {
+            background: #f8f8f8;
+            padding: 15px 20px;
+            border-left: 4px solid #666;
+            margin-bottom: 25px;
+            font-size: 16px;
+            color: #555;
+            line-height: 1.6;
+        }
+        .article-content {
+            font-size: 18px;
+            line-height: 1.9;
+        }
+        .article-content h1 {
+            color: #222;
+            font-size: 26px;
+            margin-top: 25px;
+        }
+        .article-content h2 {
+            color: #222;
+            font-size: 22px;
+            margin-top: 25px;
+        }
+        .article-content h3 {
+            color: #222;
+            font-size: 20px;
+            margin-top: 25px;
+        }
+        .article-content p {
+            font-size: 18px;
+            margin-bottom: 1em;
+        }
+        .watch-link {
+            display: inline-block;
+            margin-top: 20px;
+            padding: 12px 24px;
+            background: #ff0000;
+            color: white !important;
+            text-decoration: none;
+            border-radius: 5px;
+            font-size: 16px;
+        }
+        .footer {
+            text-align: center;
+            color: #999;
+            font-size: 14px;
+            padding: 20px;
+        }
+        .epub-note {
+            text-align: center;
+            background: #e8f4e8;
+            padding: 15px;
+            border-radius: 5px;
+            margin-bottom: 30px;
+            font-size: 16px;
+        }
+"""
+
+# Styles for ebook readers
+EPUB_CSS = """
+body {
+    font-family: Georgia, serif;
+    line-height: 1.6;
+    padding: 1em;
+}
+h1 {
+    font-size: 1.5em;
+    margin-top: 1em;
+    border-bottom: 1px solid #ccc;
+    padding-bottom: 0.3em;
+}
+h2 {
+    font-size: 1.3em;
+    margin-top: 1em;
+}
+h3 {
+    font-size: 1.1em;
+}
+.intro {
+    background: #f5f5f5;
+    padding: 1em;
+    border-left: 3px solid #666;
+    margin-bottom: 1.5em;
+    font-size: 0.95em;
+}
+.watch-link {
+    margin-top: 1.5em;
+    padding: 0.5em;
+    background: #f0f0f0;
+    display: block;
+}
+"""
+
+# The top of the email, up to the first article (the CSS is filled in right away)
+NEWSLETTER_HEADER = Template(Template("""<!DOCTYPE html>
+<html>
+<head>
+    <style>$css</style>
+</head>
+<body>
+    <div class="header">
+        <h1>YOUR YOUTUBE DIGEST</h1>
+        <p>$$date</p>
+    </div>
+    <div class="epub-note">
+        📚 EPUB ebook attached - open on your phone's ebook reader!
+    </div>
+""").substitute(css=NEWSLETTER_CSS))
+
+# One article in the email
+NEWSLETTER_ARTICLE = Template("""
+    <div class="article">
+        <div class="article-intro">
+            <em>This article is based on the video "<strong>$title</strong>" from the YouTube channel <strong>$channel</strong>.</em>
+        </div>
+        <div class="article-content">
+            $content
+        </div>
+        <a href="$url" class="watch-link">Watch the original video</a>
+    </div>
+""")
+
+NEWSLETTER_FOOTER = """
+    <div class="footer">
+        Generated by YouTube Newsletter Bot
+    </div>
+</body>
+</html>
+"""
+
+# One EPUB chapter
+EPUB_CHAPTER = Template("""<html>
+<head>
+    <link rel="stylesheet" type="text/css" href="style/nav.css"/>
+</head>
+<body>
+    <div class="intro">
+        <p><em>This article is based on the video "<strong>$title</strong>" from the YouTube channel <strong>$channel</strong>.</em></p>
+    </div>
+    $content
+    <p class="watch-link">Watch the original video: $url</p>
+</body>
+</html>
+""")
+
+
+def _article_fields(article, render):
+    """
+    Template values for one article (everything except the rendered HTML is escaped).
+    """
+    return {
+        "title": escape(article["title"]),
+        "channel": escape(article["channel"]),
+        "url": escape(article["url"]),
+        "content": render["html"]
+    }
+
+
+def render_newsletter_html(articles, rendered, date):
+    """
+    The full email HTML. `rendered` is the list from render_articles().
+    """
+    parts = [NEWSLETTER_HEADER.substitute(date=escape(date))]
+    parts.extend(
+        NEWSLETTER_ARTICLE.substitute(_article_fields(article, render))
+        for article, render in zip(articles, rendered)
+    )
+    parts.append(NEWSLETTER_FOOTER)
+    return "".join(parts)
+
+
+def render_epub_chapter(article, render):
+    """
+    The HTML for one EPUB chapter.
+    """
+    return EPUB_CHAPTER.substitute(_article_fields(article, render))
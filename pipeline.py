@@ -0,0 +1,138 @@
+"""
+Pipelined Mode: Runs steps 1-3 at the same time instead of one after another.
+Each video moves on as soon as it's ready: to transcript fetching as soon
+as its channel has been scanned, and to article writing as soon as its
+transcript arrives. Bounded queues between the steps keep a fast step from
+running too far ahead of a slow one. Total time is roughly the slowest
+single video's path, instead of the sum of all three steps.
+"""
+
+import os
+import queue
+import threading
+from get_videos import iter_channel_videos
+from get_transcripts import get_transcript, TRANSCRIPT_WORKERS
+from write_articles import write_article, ARTICLE_CONCURRENCY, print_usage_summary
+from video_tracker import filter_new_videos
+
+# How many videos can wait between two steps before the earlier step pauses
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+# Tells a worker there's no more work coming
+_DONE = object()
+
+
+def run_pipeline():
+    """
+    Find new videos, fetch their transcripts and write their articles, all
+    overlapping. Returns (new_videos, videos_with_transcripts, articles),
+    each in the same order as CHANNELS, like running the steps one by one.
+    """
+    transcript_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    article_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    new_videos = {}
+    with_transcripts = {}
+    articles = {}
+    results_lock = threading.Lock()
+
+    def discover():
+        """
+        Step 1: scan channels, pass each new video on right away.
+        """
+        for index, video, lines in iter_channel_videos():
+            for line in lines:
+                print(line)
+            if video and filter_new_videos([video]):
+                with results_lock:
+                    new_videos[index] = video
+                transcript_queue.put((index, video))
+
+    def fetch_transcripts():
+        """
+        Step 2: fetch transcripts as videos arrive.
+        """
+        while True:
+            item = transcript_queue.get()
+            if item is _DONE:
+                return
+            index, video = item
+
+            # One bad video mustn't stop the worker, or the _DONE markers would never be read
+            try:
+                transcript = get_transcript(video["video_id"])
+            except Exception as e:
+                print(f"  ⚠ Error getting transcript for {video['title'][:50]}: {e}")
+                continue
+            if not transcript:
+                print(f"  ✗ No transcript available: {video['title'][:50]}")
+                continue
+
+            video["transcript"] = transcript.text
+            video["timed_transcript"] = transcript
+            print(f"  ✓ Got {len(transcript.text.split())} words: {video['title'][:50]}")
+
+            with results_lock:
+                with_transcripts[index] = video
+            article_queue.put((index, video))
+
+    def write_articles():
+        """
+        Step 3: write articles as transcripts arrive.
+        """
+        while True:
+            item = article_queue.get()
+            if item is _DONE:
+                return
+            index, video = item
+
+            try:
+                article = write_article(video)
+            except Exception as e:
+                print(f"  ⚠ Error generating article for {video['title'][:50]}: {e}")
+                continue
+            if not article:
+                print(f"  ✗ Failed to generate article: {video['title'][:50]}")
+                continue
+
+            print(f"  ✓ Article generated: {video['title'][:50]}")
+            with results_lock:
+                articles[index] = {
+                    "video_id": video.get("video_id"),
+                    "title": video["title"],
+                    "channel": video["channel"],
+                    "url": video["url"],
+                    "article": article
+                }
+
+    transcript_workers = [threading.Thread(target=fetch_transcripts) for _ in range(max(1, TRANSCRIPT_WORKERS))]
+    article_workers = [threading.Thread(target=write_articles) for _ in range(max(1, ARTICLE_CONCURRENCY))]
+    for worker in transcript_workers + article_workers:
+        worker.start()
+
+    print("Scanning channels, fetching transcripts and writing articles at the same time...\n")
+    print("=" * 60)
+
+    # Each step tells the next one it's finished once all its own workers are done
+    try:
+        discover()
+    finally:
+        for _ in transcript_workers:
+            transcript_queue.put(_DONE)
+        for worker in transcript_workers:
+            worker.join()
+
+        for _ in article_workers:
+            article_queue.put(_DONE)
+        for worker in article_workers:
+            worker.join()
+
+    print("=" * 60)
+    print(f"Found {len(new_videos)} new video(s), got {len(with_transcripts)} transcript(s), "
+          f"wrote {len(articles)} article(s)")
+    print_usage_summary()
+
+    def in_channel_order(results):
+        return [results[index] for index in sorted(results)]
+
+    return in_channel_order(new_videos), in_channel_order(with_transcripts), in_channel_order(articles)
@@ -0,0 +1,199 @@
+"""
+Quota Ledger: Keeps track of how much YouTube Data API quota we've used today.
+Google gives each API key a daily budget (10,000 units by default) that
+resets at midnight Pacific time. Every API call is charged here *before*
+it's made, and once today's budget (YOUTUBE_DAILY_QUOTA) is used up,
+calls are refused instead of failing at YouTube. The ledger also
+remembers when each channel last posted, so the fetcher can spend a tight
+budget on the channels most likely to have something new.
+Stored in youtube_quota.json.
+"""
+
+import os
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from storage import write_json_atomic
+
+try:
+    from zoneinfo import ZoneInfo
+    _PACIFIC = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # No time zone database available - standard Pacific time is close enough
+    _PACIFIC = timezone(timedelta(hours=-8))
+
+# File to store units spent per day and when each channel last posted
+QUOTA_LEDGER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "youtube_quota.json")
+
+# Daily quota for your API key (Google's default is 10,000 units)
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+
+# How many days of spending history to keep
+QUOTA_HISTORY_DAYS = 30
+
+_lock = threading.Lock()
+_ledger = None
+_dirty = False
+
+# Units set aside by reserve() for the current thread's calls
+_reserved = threading.local()
+
+
+class QuotaExhausted(Exception):
+    """
+    Raised when an API call would go over today's quota budget.
+    """
+
+
+def quota_day():
+    """
+    Today's date in the time zone YouTube's quota resets in ("2025-01-01").
+    """
+    return datetime.now(_PACIFIC).date().isoformat()
+
+
+def _get_ledger():
+    global _ledger
+    if _ledger is None:
+        _ledger = {"days": {}, "channels": {}}
+        if os.path.exists(QUOTA_LEDGER_FILE):
+            try:
+                with open(QUOTA_LEDGER_FILE, "r") as f:
+                    _ledger.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+    return _ledger
+
+
+def spent_today():
+    """
+    Units spent so far today.
+    """
+    with _lock:
+        return _get_ledger()["days"].get(quota_day(), 0)
+
+
+def remaining_today():
+    """
+    Units left in today's budget.
+    """
+    return max(0, YOUTUBE_DAILY_QUOTA - spent_today())
+
+
+def try_spend(units):
+    """
+    Charge `units` to today's budget if they fit. Returns True if charged,
+    False (and charges nothing) if that would go over YOUTUBE_DAILY_QUOTA.
+    Safe to call from several threads at once.
+    """
+    global _dirty
+    with _lock:
+        days = _get_ledger()["days"]
+        today = quota_day()
+        spent = days.get(today, 0)
+        if spent + units > YOUTUBE_DAILY_QUOTA:
+            return False
+        days[today] = spent + units
+        _dirty = True
+        return True
+
+
+def refund(units):
+    """
+    Give back units that were charged but not used.
+    """
+    global _dirty
+    with _lock:
+        days = _get_ledger()["days"]
+        today = quota_day()
+        days[today] = max(0, days.get(today, 0) - units)
+        _dirty = True
+
+
+def _exhausted(units, what):
+    return QuotaExhausted(
+        f"{what} needs {units} unit(s) but only {remaining_today()} of "
+        f"today's {YOUTUBE_DAILY_QUOTA} are left (resets at midnight Pacific time)"
+    )
+
+
+def spend(units, what="YouTube API call"):
+    """
+    Like try_spend(), but raises QuotaExhausted if the units don't fit.
+    Units reserved by this thread (see reserve()) are used first.
+    """
+    reserved = getattr(_reserved, "units", 0)
+    if reserved >= units:
+        _reserved.units = reserved - units
+        return
+    if not try_spend(units):
+        raise _exhausted(units, what)
+
+
+@contextmanager
+def reserve(units, what="YouTube API calls"):
+    """
+    Charge `units` up front for a job that makes several calls, so parallel
+    jobs can't all start on the same last few units. spend() calls made by
+    this thread inside the block draw from the reservation, and whatever is
+    left over is given back at the end. Raises QuotaExhausted if they don't fit.
+        with reserve(3, "@channel"):
+            ...
+    """
+    if not try_spend(units):
+        raise _exhausted(units, what)
+    _reserved.units = units
+    try:
+        yield
+    finally:
+        unused = _reserved.units
+        _reserved.units = 0
+        if unused:
+            refund(unused)
+
+
+def last_posted(channel_handle):
+    """
+    When the channel's latest long-form video came out (ISO 8601), or None if unknown.
+    """
+    with _lock:
+        entry = _get_ledger()["channels"].get(channel_handle.lstrip("@").lower())
+    return entry.get("last_posted") if entry else None
+
+
+def record_last_posted(channel_handle, published_at):
+    """
+    Remember when a channel's latest long-form video came out.
+    """
+    global _dirty
+    if not published_at:
+        return
+    with _lock:
+        _get_ledger()["channels"][channel_handle.lstrip("@").lower()] = {"last_posted": published_at}
+        _dirty = True
+
+
+def save_ledger():
+    """
+    Write the ledger to disk (only if something changed), dropping old days.
+    """
+    global _dirty
+    with _lock:
+        if not _dirty:
+            return
+
+        ledger = _get_ledger()
+        cutoff = (datetime.now(_PACIFIC).date() - timedelta(days=QUOTA_HISTORY_DAYS)).isoformat()
+        ledger["days"] = {day: units for day, units in ledger["days"].items() if day >= cutoff}
+
+        write_json_atomic(QUOTA_LEDGER_FILE, ledger)
+        _dirty = False
+
+
+# Utility to view quota usage
+if __name__ == "__main__":
+    ledger = _get_ledger()
+    print(f"Today ({quota_day()}, Pacific time): {spent_today()} / {YOUTUBE_DAILY_QUOTA} units used\n")
+    for day, units in sorted(ledger["days"].items(), reverse=True)[:14]:
+        print(f"• {day}: {units} units")
@@ -0,0 +1,113 @@
+"""
+Rate Limiting: Keeps parallel workers from hammering an API.
+A token bucket lets requests through at a steady rate, and an adaptive
+concurrency limit caps how many run at once. Both slow themselves down
+automatically when the API starts telling us to back off.
+"""
+
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Classic token bucket: tokens drip in at `rate` per second (up to `capacity`),
+    and every request spends one. Adaptive: backoff() halves the rate when we
+    get throttled, recover() creeps it back up after each success.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """
+        Wait until a request is allowed, then spend a token.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            # Sleep outside the lock so other threads can check too
+            time.sleep(wait)
+
+    def backoff(self):
+        """
+        We got throttled: halve the rate and empty the bucket so everyone pauses.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def recover(self):
+        """
+        A request went through: speed back up a little (10% of the max rate).
+        """
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+class AdaptiveConcurrency:
+    """
+    Limits how many requests run at once, and adapts the limit:
+    shrink() halves it when the API says it's overloaded (429/529),
+    and it grows back by one after every `grow_after` successes.
+    Use it as a context manager around each request.
+    """
+
+    def __init__(self, max_limit, min_limit=1, grow_after=3):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.grow_after = grow_after
+        self.active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+        return False
+
+    def shrink(self):
+        """
+        The API pushed back: halve the number of requests allowed at once.
+        """
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._successes = 0
+
+    def grow(self):
+        """
+        A request succeeded: after enough of these, allow one more at once.
+        """
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.grow_after and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
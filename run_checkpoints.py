@@ -0,0 +1,136 @@
+"""
+Run Checkpoints: Saves each step's results as the pipeline goes.
+Every run gets an ID and a folder under runs/. After each step finishes, its
+output is written there, so a crash or a failed email can be resumed with
+`python main.py --resume` instead of fetching and writing everything again.
+"""
+
+import os
+import json
+import shutil
+from datetime import datetime
+from storage import write_json_atomic
+
+# Folder holding one sub-folder per run
+RUNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs")
+
+# How many old runs to keep around
+RUNS_TO_KEEP = int(os.getenv("RUNS_TO_KEEP", "20"))
+
+
+def _run_dir(run_id):
+    return os.path.join(RUNS_DIR, run_id)
+
+
+def new_run():
+    """
+    Start a new run and return its ID (e.g. "20250101_083000").
+    """
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs(_run_dir(run_id), exist_ok=True)
+    write_json_atomic(os.path.join(_run_dir(run_id), "state.json"), {
+        "run_id": run_id,
+        "started_at": datetime.now().isoformat(),
+        "completed": False
+    })
+    prune_runs()
+    return run_id
+
+
+def list_runs():
+    """
+    All run IDs, oldest first.
+    """
+    if not os.path.isdir(RUNS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(RUNS_DIR)
+        if os.path.exists(os.path.join(RUNS_DIR, name, "state.json"))
+    )
+
+
+def load_state(run_id):
+    """
+    Return a run's state (or None if there's no such run).
+    """
+    path = os.path.join(_run_dir(run_id), "state.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def latest_unfinished_run():
+    """
+    The most recent run that didn't complete (and wasn't superseded), or None.
+    """
+    for run_id in reversed(list_runs()):
+        state = load_state(run_id)
+        if state and not state.get("completed") and not state.get("superseded_by"):
+            return run_id
+    return None
+
+
+def save_stage(run_id, stage, data):
+    """
+    Save one step's output (e.g. "videos", "transcripts", "articles").
+    """
+    write_json_atomic(os.path.join(_run_dir(run_id), f"{stage}.json"), data)
+
+    state = load_state(run_id)
+    state.setdefault("stages", {})[stage] = datetime.now().isoformat()
+    write_json_atomic(os.path.join(_run_dir(run_id), "state.json"), state)
+
+
+def load_stage(run_id, stage):
+    """
+    Load one step's saved output, or None if that step hasn't finished yet.
+    """
+    path = os.path.join(_run_dir(run_id), f"{stage}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def mark_complete(run_id):
+    """
+    Record that a run finished, so --resume won't pick it up again.
+    Older unfinished runs are marked as superseded too: this run may already
+    have sent their videos, so resuming them could send those videos twice.
+    """
+    state = load_state(run_id)
+    state["completed"] = True
+    state["completed_at"] = datetime.now().isoformat()
+    write_json_atomic(os.path.join(_run_dir(run_id), "state.json"), state)
+
+    for older_id in list_runs():
+        if older_id >= run_id:
+            break
+        older = load_state(older_id)
+        if older and not older.get("completed") and not older.get("superseded_by"):
+            older["superseded_by"] = run_id
+            write_json_atomic(os.path.join(_run_dir(older_id), "state.json"), older)
+
+
+def prune_runs():
+    """
+    Delete the oldest runs beyond RUNS_TO_KEEP.
+    """
+    runs = list_runs()
+    for run_id in runs[:max(0, len(runs) - RUNS_TO_KEEP)]:
+        shutil.rmtree(_run_dir(run_id), ignore_errors=True)
+
+
+# Utility to view past runs
+if __name__ == "__main__":
+    for run_id in list_runs():
+        state = load_state(run_id)
+        if state.get("completed"):
+            status = "✓ complete"
+        elif state.get("superseded_by"):
+            status = f"✗ superseded by {state['superseded_by']}"
+        else:
+            status = "… unfinished"
+        stages = ", ".join(state.get("stages", {})) or "no steps finished"
+        print(f"• {run_id}: {status} ({stages})")
@@ -1,19 +1,33 @@
+import os
 import sys
 from youtube_transcript_api import YouTubeTranscriptApi
 
+# Share the transcript cache with the Python app (one directory up)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from transcript import Transcript
+from transcript_cache import load_transcript, save_transcript
+
+LANGUAGES = ['en', 'fr']
+
 def get_transcript(video_id):
+    # Already downloaded? Serve it from the cache
+    cached = load_transcript(video_id, LANGUAGES)
+    if cached:
+        print(cached["text"])
+        sys.exit(0)
+
     try:
         # Create an instance of the API (newer version syntax)
         ytt_api = YouTubeTranscriptApi()
         
         # Try fetching English or French
-        transcript_list = ytt_api.fetch(video_id, languages=['en', 'fr'])
+        transcript_list = ytt_api.fetch(video_id, languages=LANGUAGES)
         
-        full_text = ""
-        for segment in transcript_list:
-            full_text += segment.text + " "
-            
-        print(full_text.strip())
+        # Join the segments in one pass (keeps timestamps for the cache)
+        transcript = Transcript.from_segments(transcript_list, transcript_list.language_code)
+        save_transcript(video_id, transcript)
+
+        print(transcript.text)
         sys.exit(0)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
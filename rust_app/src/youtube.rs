@@ -1,12 +1,22 @@
 use crate::models::Video;
 use anyhow::{Context, Result};
 use reqwest::Client;
-use serde::Deserialize;
-use std::time::Duration;
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::env;
+use std::fs;
+use std::path::PathBuf;
+use std::sync::Mutex;
+use std::time::{Duration, SystemTime, UNIX_EPOCH};
+
+// Shared with the Python app (youtube_cache.py), which lives one directory up
+const DEFAULT_CHANNEL_CACHE_FILE: &str = "../channel_cache.json";
+const DEFAULT_CHANNEL_CACHE_TTL_DAYS: f64 = 30.0;
 
 pub struct YouTubeClient {
     client: Client,
     api_key: String,
+    channel_cache: Mutex<ChannelCache>,
 }
 
 impl YouTubeClient {
@@ -17,6 +27,7 @@ impl YouTubeClient {
                 .build()
                 .unwrap_or_default(),
             api_key,
+            channel_cache: Mutex::new(ChannelCache::load()),
         }
     }
 
@@ -35,6 +46,11 @@ impl YouTubeClient {
             }
         }
 
+        // Remember any newly resolved channels for next time
+        if let Err(e) = self.channel_cache.lock().unwrap().save() {
+            println!("  ⚠ Could not save channel cache: {}", e);
+        }
+
         Ok(videos)
     }
 
@@ -66,15 +82,32 @@ impl YouTubeClient {
     }
 
     async fn get_uploads_playlist_id(&self, handle: &str) -> Result<String> {
+        // Known handles skip the API call entirely
+        if let Some(uploads_id) = self.channel_cache.lock().unwrap().get(handle) {
+            return Ok(uploads_id);
+        }
+
         let url = format!(
-            "https://www.googleapis.com/youtube/v3/channels?part=contentDetails&forHandle={}&key={}",
+            "https://www.googleapis.com/youtube/v3/channels?part=snippet,contentDetails&forHandle={}&key={}",
             handle, self.api_key
         );
 
         let resp: ChannelResponse = self.client.get(&url).send().await?.json().await?;
         
         let item = resp.items.first().context("Channel not found")?;
-        Ok(item.content_details.related_playlists.uploads.clone())
+        let uploads_id = item.content_details.related_playlists.uploads.clone();
+
+        self.channel_cache.lock().unwrap().insert(
+            handle,
+            CachedChannel {
+                channel_id: item.id.clone(),
+                channel_name: item.snippet.title.clone(),
+                uploads_playlist_id: uploads_id.clone(),
+                resolved_at: unix_now(),
+            },
+        );
+
+        Ok(uploads_id)
     }
 
     async fn get_playlist_items(&self, playlist_id: &str) -> Result<Vec<PlaylistItem>> {
@@ -98,6 +131,87 @@ impl YouTubeClient {
     }
 }
 
+// --- Channel Cache ---
+
+/// On-disk handle -> channel/uploads playlist cache, same format as youtube_cache.py.
+/// Set REFRESH_CHANNEL_CACHE=1 to ignore it and look every handle up again.
+struct ChannelCache {
+    path: PathBuf,
+    ttl_days: f64,
+    refresh: bool,
+    channels: HashMap<String, CachedChannel>,
+    dirty: bool,
+}
+
+#[derive(Serialize, Deserialize)]
+struct CachedChannel {
+    channel_id: String,
+    channel_name: String,
+    uploads_playlist_id: String,
+    resolved_at: f64,
+}
+
+impl ChannelCache {
+    fn load() -> Self {
+        let path = PathBuf::from(
+            env::var("CHANNEL_CACHE_FILE").unwrap_or_else(|_| DEFAULT_CHANNEL_CACHE_FILE.to_string()),
+        );
+        let ttl_days = env::var("CHANNEL_CACHE_TTL_DAYS")
+            .ok()
+            .and_then(|v| v.parse().ok())
+            .unwrap_or(DEFAULT_CHANNEL_CACHE_TTL_DAYS);
+        let refresh = env::var("REFRESH_CHANNEL_CACHE").map(|v| v == "1").unwrap_or(false);
+
+        // A missing or broken cache file just means an empty cache
+        let channels = fs::read_to_string(&path)
+            .ok()
+            .and_then(|text| serde_json::from_str(&text).ok())
+            .unwrap_or_default();
+
+        Self { path, ttl_days, refresh, channels, dirty: false }
+    }
+
+    fn key(handle: &str) -> String {
+        handle.trim_start_matches('@').to_lowercase()
+    }
+
+    fn get(&self, handle: &str) -> Option<String> {
+        if self.refresh {
+            return None;
+        }
+        let entry = self.channels.get(&Self::key(handle))?;
+        let age_days = (unix_now() - entry.resolved_at) / 86400.0;
+        if age_days > self.ttl_days {
+            return None;
+        }
+        Some(entry.uploads_playlist_id.clone())
+    }
+
+    fn insert(&mut self, handle: &str, channel: CachedChannel) {
+        self.channels.insert(Self::key(handle), channel);
+        self.dirty = true;
+    }
+
+    fn save(&mut self) -> Result<()> {
+        if !self.dirty {
+            return Ok(());
+        }
+        // Write to a temp file and swap it in so a crash can't corrupt the cache
+        let tmp_path = self.path.with_extension("json.tmp");
+        fs::write(&tmp_path, serde_json::to_string_pretty(&self.channels)?)?;
+        fs::rename(&tmp_path, &self.path)?;
+        self.dirty = false;
+        Ok(())
+    }
+}
+
+fn unix_now() -> f64 {
+    SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .map(|d| d.as_secs_f64())
+        .unwrap_or(0.0)
+}
+
 // --- API Response Structs ---
 
 #[derive(Deserialize)]
@@ -107,10 +221,17 @@ struct ChannelResponse {
 
 #[derive(Deserialize)]
 struct ChannelItem {
+    id: String,
+    snippet: ChannelSnippet,
     #[serde(rename = "contentDetails")]
     content_details: ContentDetails,
 }
 
+#[derive(Deserialize)]
+struct ChannelSnippet {
+    title: String,
+}
+
 #[derive(Deserialize)]
 struct ContentDetails {
     #[serde(rename = "relatedPlaylists")]
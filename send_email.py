@@ -4,110 +4,83 @@ Sends the generated articles as a nicely formatted email newsletter with EPUB at
 """
 
 import os
-import smtplib
-import markdown
+import io
+import json
+import shutil
+import zlib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
 from datetime import datetime
 from dotenv import load_dotenv
 from ebooklib import epub
+from article_render import render_articles
+from newsletter_templates import EPUB_CSS, render_epub_chapter, render_newsletter_html
+from smtp_stream import StreamedAttachment, message_size
+from smtp_delivery import DeliveryPool
+from archive_catalog import add_digest
+from article_search import index_articles
 
 # Load your credentials
 load_dotenv()
 GMAIL_ADDRESS = os.getenv("GMAIL_ADDRESS")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
 
+# Who gets the newsletter (comma-separated); defaults to yourself
+NEWSLETTER_RECIPIENTS = [
+    address.strip() for address in os.getenv("NEWSLETTER_RECIPIENTS", "").split(",") if address.strip()
+]
 
-def create_epub(articles):
+# Bigger digests are split into several emails ("part 1 of 3"), each under this size.
+# Gmail's limit is 25 MB including attachments.
+EMAIL_MAX_MB = float(os.getenv("EMAIL_MAX_MB", "20"))
+EMAIL_MAX_BYTES = int(EMAIL_MAX_MB * 1024 * 1024)
+
+# Rough size of everything in an email besides the articles (styles, EPUB skeleton)
+_MESSAGE_OVERHEAD_BYTES = 32 * 1024
+
+
+def build_epub(articles, rendered=None, part=None):
     """
-    Create an EPUB ebook from the articles for reading on mobile devices.
-    Returns the path to the generated EPUB file.
+    Build an EPUB ebook from the articles, entirely in memory.
+    Returns (filename, buffer) - the buffer can be attached to the email and
+    saved to the archive directly, without writing a temp file first.
+    `rendered` is the list from render_articles() (rendered here if not given).
+    `part` numbers the ebook when a digest is split across several emails.
     """
+    if rendered is None:
+        rendered = render_articles(articles)
+
     today = datetime.now().strftime("%B %d, %Y")
-    filename = f"youtube_digest_{datetime.now().strftime('%Y%m%d')}.epub"
-    filepath = os.path.join(os.path.dirname(__file__), filename)
+    suffix = f"_part{part}" if part else ""
+    filename = f"youtube_digest_{datetime.now().strftime('%Y%m%d')}{suffix}.epub"
 
     # Create the ebook
     book = epub.EpubBook()
 
     # Set metadata
-    book.set_identifier(f"youtube-digest-{datetime.now().strftime('%Y%m%d%H%M%S')}")
-    book.set_title(f"YouTube Digest - {today}")
+    book.set_identifier(f"youtube-digest-{datetime.now().strftime('%Y%m%d%H%M%S')}{suffix}")
+    book.set_title(f"YouTube Digest - {today}" + (f" (Part {part})" if part else ""))
     book.set_language("en")
     book.add_author("YouTube Newsletter Bot")
 
-    # CSS for nice formatting on ebook readers
-    style = """
-    body {
-        font-family: Georgia, serif;
-        line-height: 1.6;
-        padding: 1em;
-    }
-    h1 {
-        font-size: 1.5em;
-        margin-top: 1em;
-        border-bottom: 1px solid #ccc;
-        padding-bottom: 0.3em;
-    }
-    h2 {
-        font-size: 1.3em;
-        margin-top: 1em;
-    }
-    h3 {
-        font-size: 1.1em;
-    }
-    .intro {
-        background: #f5f5f5;
-        padding: 1em;
-        border-left: 3px solid #666;
-        margin-bottom: 1.5em;
-        font-size: 0.95em;
-    }
-    .watch-link {
-        margin-top: 1.5em;
-        padding: 0.5em;
-        background: #f0f0f0;
-        display: block;
-    }
-    """
     nav_css = epub.EpubItem(
         uid="style_nav",
         file_name="style/nav.css",
         media_type="text/css",
-        content=style
+        content=EPUB_CSS
     )
     book.add_item(nav_css)
 
     chapters = []
 
     # Create a chapter for each article
-    for i, article in enumerate(articles):
-        # Convert markdown to HTML
-        article_html = markdown.markdown(article['article'])
-
-        chapter_content = f"""
-        <html>
-        <head>
-            <link rel="stylesheet" type="text/css" href="style/nav.css"/>
-        </head>
-        <body>
-            <div class="intro">
-                <p><em>This article is based on the video "<strong>{article['title']}</strong>" from the YouTube channel <strong>{article['channel']}</strong>.</em></p>
-            </div>
-            {article_html}
-            <p class="watch-link">Watch the original video: {article['url']}</p>
-        </body>
-        </html>
-        """
-
+    for i, (article, render) in enumerate(zip(articles, rendered)):
         chapter = epub.EpubHtml(
             title=article['title'][:50],
             file_name=f"chapter_{i+1}.xhtml",
             lang="en"
         )
-        chapter.content = chapter_content
+        chapter.content = render_epub_chapter(article, render)
         chapter.add_item(nav_css)
 
         book.add_item(chapter)
@@ -123,160 +96,54 @@ def create_epub(articles):
     # Set the reading order
     book.spine = ["nav"] + chapters
 
-    # Write the EPUB file
-    epub.write_epub(filepath, book)
+    # Write the EPUB into a memory buffer
+    buffer = io.BytesIO()
+    epub.write_epub(buffer, book)
+    buffer.seek(0)
 
     print(f"  ✓ Created EPUB: {filename}")
-    return filepath
+    return filename, buffer
 
 
-def create_newsletter_html(articles):
+def create_epub(articles, rendered=None):
     """
-    Create a beautifully formatted HTML newsletter from the articles.
-    Uses larger fonts for better readability.
+    Create an EPUB ebook from the articles for reading on mobile devices.
+    Returns the path to the generated EPUB file.
     """
-    today = datetime.now().strftime("%B %d, %Y")
+    filename, buffer = build_epub(articles, rendered)
+    filepath = os.path.join(os.path.dirname(__file__), filename)
 
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{
-                font-family: Georgia, serif;
-                font-size: 18px;
-                max-width: 700px;
-                margin: 0 auto;
-                padding: 20px;
-                background-color: #f9f9f9;
-                color: #333;
-            }}
-            .header {{
-                text-align: center;
-                padding: 30px 0;
-                border-bottom: 3px solid #333;
-                margin-bottom: 30px;
-            }}
-            .header h1 {{
-                margin: 0;
-                font-size: 32px;
-                letter-spacing: 2px;
-            }}
-            .header p {{
-                color: #666;
-                font-size: 18px;
-                margin: 10px 0 0 0;
-            }}
-            .article {{
-                background: white;
-                padding: 30px;
-                margin-bottom: 30px;
-                border-radius: 5px;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            }}
-            .article-intro {{
-                background: #f8f8f8;
-                padding: 15px 20px;
-                border-left: 4px solid #666;
-                margin-bottom: 25px;
-                font-size: 16px;
-                color: #555;
-                line-height: 1.6;
-            }}
-            .article-content {{
-                font-size: 18px;
-                line-height: 1.9;
-            }}
-            .article-content h1 {{
-                color: #222;
-                font-size: 26px;
-                margin-top: 25px;
-            }}
-            .article-content h2 {{
-                color: #222;
-                font-size: 22px;
-                margin-top: 25px;
-            }}
-            .article-content h3 {{
-                color: #222;
-                font-size: 20px;
-                margin-top: 25px;
-            }}
-            .article-content p {{
-                font-size: 18px;
-                margin-bottom: 1em;
-            }}
-            .watch-link {{
-                display: inline-block;
-                margin-top: 20px;
-                padding: 12px 24px;
-                background: #ff0000;
-                color: white !important;
-                text-decoration: none;
-                border-radius: 5px;
-                font-size: 16px;
-            }}
-            .footer {{
-                text-align: center;
-                color: #999;
-                font-size: 14px;
-                padding: 20px;
-            }}
-            .epub-note {{
-                text-align: center;
-                background: #e8f4e8;
-                padding: 15px;
-                border-radius: 5px;
-                margin-bottom: 30px;
-                font-size: 16px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>YOUR YOUTUBE DIGEST</h1>
-            <p>{today}</p>
-        </div>
-        <div class="epub-note">
-            📚 EPUB ebook attached - open on your phone's ebook reader!
-        </div>
-    """
+    with open(filepath, "wb") as f:
+        f.write(buffer.getbuffer())
 
-    for article in articles:
-        # Convert markdown article to HTML
-        article_html = markdown.markdown(article['article'])
-
-        html += f"""
-        <div class="article">
-            <div class="article-intro">
-                <em>This article is based on the video "<strong>{article['title']}</strong>" from the YouTube channel <strong>{article['channel']}</strong>.</em>
-            </div>
-            <div class="article-content">
-                {article_html}
-            </div>
-            <a href="{article['url']}" class="watch-link">Watch the original video</a>
-        </div>
-        """
-
-    html += """
-        <div class="footer">
-            Generated by YouTube Newsletter Bot
-        </div>
-    </body>
-    </html>
+    return filepath
+
+
+def create_newsletter_html(articles, rendered=None):
+    """
+    Create a beautifully formatted HTML newsletter from the articles.
+    Uses larger fonts for better readability.
+    `rendered` is the list from render_articles() (rendered here if not given).
     """
+    if rendered is None:
+        rendered = render_articles(articles)
 
-    return html
+    today = datetime.now().strftime("%B %d, %Y")
+    return render_newsletter_html(articles, rendered, today)
 
 
-def save_newsletter_archive(html_content, epub_path, articles):
+def save_newsletter_archive(html_content, epub, articles, part=None, total_parts=None):
     """
     Save a copy of the newsletter for viewing in the archive.
+    `epub` is either an in-memory buffer from build_epub() or a path to an EPUB file.
+    Each part of a split digest is saved separately (newsletter_<time>_part2...).
     """
     newsletters_dir = os.path.join(os.path.dirname(__file__), "newsletters")
     os.makedirs(newsletters_dir, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if part:
+        timestamp += f"_part{part}"
     date_display = datetime.now().strftime("%B %d, %Y")
 
     # Save HTML
@@ -284,10 +151,13 @@ def save_newsletter_archive(html_content, epub_path, articles):
     with open(html_path, "w") as f:
         f.write(html_content)
 
-    # Copy EPUB
-    import shutil
+    # Save EPUB (straight from memory when we have the buffer)
     epub_archive_path = os.path.join(newsletters_dir, f"newsletter_{timestamp}.epub")
-    shutil.copy(epub_path, epub_archive_path)
+    if isinstance(epub, str):
+        shutil.copy(epub, epub_archive_path)
+    else:
+        with open(epub_archive_path, "wb") as f:
+            f.write(epub.getbuffer())
 
     # Save metadata
     metadata = {
@@ -299,37 +169,72 @@ def save_newsletter_archive(html_content, epub_path, articles):
         "html_file": f"newsletter_{timestamp}.html",
         "epub_file": f"newsletter_{timestamp}.epub"
     }
+    if part:
+        metadata["part"] = part
+        metadata["total_parts"] = total_parts
 
     metadata_path = os.path.join(newsletters_dir, f"newsletter_{timestamp}.json")
-    import json
     with open(metadata_path, "w") as f:
         json.dump(metadata, f, indent=2)
 
+    # Index it so the archive can be browsed (and searched) without reading every file.
+    # The email has already gone out, so a broken index only gets a warning.
+    try:
+        add_digest(metadata, articles)
+    except Exception as e:
+        print(f"  ⚠ Could not add the newsletter to the archive catalog: {e}")
+    try:
+        index_articles(timestamp, articles)
+    except Exception as e:
+        print(f"  ⚠ Could not add the articles to the search index: {e}")
+
     print(f"  ✓ Saved newsletter to archive")
 
 
-def send_newsletter(articles, recipient_email=None):
+def _estimated_email_bytes(article, render):
     """
-    Send the newsletter via Gmail with EPUB attachment.
-    If no recipient specified, sends to yourself.
+    Roughly how much one article adds to an email: its HTML and plain-text
+    copies plus its (compressed) EPUB chapter, all base64-encoded.
     """
-    if not articles:
-        print("No articles to send!")
-        return False
+    html = len(render["html"].encode("utf-8"))
+    text = len(render["text"].encode("utf-8")) + len(article["url"])
+    chapter = len(zlib.compress(render["html"].encode("utf-8"))) + 1024
+    return (html + text + chapter + 1024) * 4 // 3
 
-    # Default to sending to yourself
-    if recipient_email is None:
-        recipient_email = GMAIL_ADDRESS
 
-    print(f"\nPreparing newsletter for {recipient_email}...")
+def split_for_email(articles, rendered):
+    """
+    Group the articles (in order) into emails that each fit in EMAIL_MAX_BYTES.
+    Returns a list of groups of article positions - usually just one group.
+    """
+    groups = [[]]
+    size = _MESSAGE_OVERHEAD_BYTES
+
+    for i, (article, render) in enumerate(zip(articles, rendered)):
+        article_bytes = _estimated_email_bytes(article, render)
+        if groups[-1] and size + article_bytes > EMAIL_MAX_BYTES:
+            groups.append([])
+            size = _MESSAGE_OVERHEAD_BYTES
+        groups[-1].append(i)
+        size += article_bytes
+
+    return groups
+
 
-    # Create EPUB ebook
-    print("  Creating EPUB ebook...")
-    epub_path = create_epub(articles)
+def build_message(articles, rendered, recipient_email, part=None, total_parts=None):
+    """
+    Build one newsletter email (HTML + plain text + EPUB attachment).
+    Returns (msg, html_content, epub_buffer).
+    """
+    part_label = f" (part {part} of {total_parts})" if part else ""
+
+    # Create EPUB ebook (built once, in memory)
+    print(f"  Creating EPUB ebook{part_label}...")
+    epub_filename, epub_buffer = build_epub(articles, rendered, part)
 
     # Create the email (mixed type for attachments)
     msg = MIMEMultipart("mixed")
-    msg["Subject"] = f"Your YouTube Digest - {datetime.now().strftime('%B %d, %Y')}"
+    msg["Subject"] = f"Your YouTube Digest - {datetime.now().strftime('%B %d, %Y')}{part_label}"
     msg["From"] = GMAIL_ADDRESS
     msg["To"] = recipient_email
 
@@ -337,59 +242,148 @@ def send_newsletter(articles, recipient_email=None):
     body = MIMEMultipart("alternative")
 
     # Create HTML content
-    html_content = create_newsletter_html(articles)
+    html_content = create_newsletter_html(articles, rendered)
 
     # Create plain text version (simple fallback)
-    text_content = "Your YouTube Newsletter\n\n"
-    text_content += "📚 EPUB ebook attached - open on your phone's ebook reader!\n\n"
-    for article in articles:
-        text_content += f"--- {article['channel']} ---\n"
-        text_content += f"{article['article']}\n"
-        text_content += f"Watch: {article['url']}\n\n"
+    text_parts = ["Your YouTube Newsletter\n\n",
+                  "📚 EPUB ebook attached - open on your phone's ebook reader!\n\n"]
+    for article, render in zip(articles, rendered):
+        text_parts.append(f"--- {article['channel']} ---\n{render['text']}\nWatch: {article['url']}\n\n")
 
     # Attach both text versions to body
-    body.attach(MIMEText(text_content, "plain"))
+    body.attach(MIMEText("".join(text_parts), "plain"))
     body.attach(MIMEText(html_content, "html"))
 
     # Add body to message
     msg.attach(body)
 
-    # Attach EPUB file
-    print("  Attaching EPUB file...")
-    with open(epub_path, "rb") as attachment:
-        part = MIMEBase("application", "epub+zip")
-        part.set_payload(attachment.read())
-        encoders.encode_base64(part)
-        part.add_header(
-            "Content-Disposition",
-            f"attachment; filename={os.path.basename(epub_path)}"
-        )
-        msg.attach(part)
+    # Attach EPUB file (base64-encoded block by block while sending, not all at once here)
+    msg.attach(StreamedAttachment("application", "epub+zip", epub_buffer.getbuffer(), epub_filename))
+
+    return msg, html_content, epub_buffer
+
+
+def deliver_newsletter(articles, recipients, pool=None, archive=True):
+    """
+    Build the newsletter once and send it to every recipient.
+    Uses `pool` (a DeliveryPool) if given, otherwise connects to SMTP_HOST.
+    Returns a delivery report:
+        {"delivered": [...], "failed": {address: error}, "parts": n,
+         "attempts": n, "bytes": n, "seconds": n}
+    A recipient only counts as delivered once they've received every part.
+    """
+    recipients = list(recipients)
+    report = {"delivered": [], "failed": {}, "parts": 0, "attempts": 0, "bytes": 0, "seconds": 0}
+
+    # Render every article's markdown once - shared by the EPUB, HTML and text versions
+    rendered = render_articles(articles)
+
+    groups = split_for_email(articles, rendered)
+    report["parts"] = len(groups)
+    if len(groups) > 1:
+        print(f"  Digest is over {EMAIL_MAX_MB:g} MB - splitting it into {len(groups)} emails")
+
+    # With one recipient their address goes in To:, otherwise nobody sees the others' addresses
+    to_header = recipients[0] if len(recipients) == 1 else GMAIL_ADDRESS
+
+    own_pool = pool is None
+    pool = pool or DeliveryPool()
+    pending = recipients
 
     try:
-        # Connect to Gmail and send
-        print("  Sending email...")
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
-            server.sendmail(GMAIL_ADDRESS, recipient_email, msg.as_string())
+        for number, group in enumerate(groups, 1):
+            part = number if len(groups) > 1 else None
+            part_articles = [articles[i] for i in group]
+            part_rendered = [rendered[i] for i in group]
+
+            msg, html_content, epub_buffer = build_message(
+                part_articles, part_rendered, to_header, part, len(groups)
+            )
+
+            size = message_size(msg)
+            if size > EMAIL_MAX_BYTES:
+                print(f"  ⚠ Email is {size / 1024 / 1024:.1f} MB, over the {EMAIL_MAX_MB:g} MB limit")
+
+            # One message, streamed to everyone over the pool's open connections
+            print(f"  Sending email ({size / 1024:.0f} KB) to {len(pending)} recipient(s)...")
+            part_report = pool.deliver(msg, pending, GMAIL_ADDRESS, size)
+            del msg
+
+            for key in ("attempts", "bytes", "seconds"):
+                report[key] += part_report[key]
+            for address, error in part_report["failed"].items():
+                print(f"  ✗ {address}: {error}")
+                report["failed"][address] = error
+
+            # Later parts only go to people who got the earlier ones
+            pending = part_report["delivered"]
+            if not pending:
+                break
+
+            # Save to archive (the EPUB goes straight from memory to the archive)
+            if archive:
+                save_newsletter_archive(html_content, epub_buffer, part_articles, part, len(groups))
+    finally:
+        if own_pool:
+            pool.close()
+
+    report["delivered"] = pending
+    report["seconds"] = round(report["seconds"], 3)
+    return report
 
-        print("✓ Newsletter sent successfully with EPUB attachment!")
 
-        # Save to archive before cleaning up
-        save_newsletter_archive(html_content, epub_path, articles)
+def send_newsletter(articles, recipient_email=None):
+    """
+    Send the newsletter with EPUB attachment.
+    `recipient_email` can be one address or a list. If not given, sends to
+    NEWSLETTER_RECIPIENTS (or to yourself if that's empty).
+    Big digests are split into numbered emails that each fit in EMAIL_MAX_MB.
+    Returns True if the newsletter reached at least one recipient.
+    """
+    if not articles:
+        print("No articles to send!")
+        return False
 
-        # Clean up EPUB file
-        os.remove(epub_path)
+    if recipient_email is None:
+        recipients = NEWSLETTER_RECIPIENTS or [GMAIL_ADDRESS]
+    elif isinstance(recipient_email, str):
+        recipients = [recipient_email]
+    else:
+        recipients = list(recipient_email)
 
-        return True
+    if len(recipients) == 1:
+        print(f"\nPreparing newsletter for {recipients[0]}...")
+    else:
+        print(f"\nPreparing newsletter for {len(recipients)} recipients...")
 
+    try:
+        report = deliver_newsletter(articles, recipients)
     except Exception as e:
         print(f"✗ Failed to send email: {e}")
         return False
 
+    if not report["delivered"]:
+        print("✗ Failed to send email to anyone")
+        return False
+
+    print(f"✓ Newsletter sent successfully with EPUB attachment to "
+          f"{len(report['delivered'])}/{len(recipients)} recipient(s)!")
+    return True
+
 
 # Test it standalone
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Send a test newsletter.")
+    parser.add_argument(
+        "--local-smtp", action="store_true",
+        help="send through a local SMTP sink instead of Gmail and report throughput"
+    )
+    parser.add_argument("--recipients", type=int, default=50, help="fake recipients for --local-smtp")
+    parser.add_argument("--sessions", type=int, default=None, help="parallel SMTP connections")
+    args = parser.parse_args()
+
     # Test with mock articles
     test_articles = [
         {
@@ -400,5 +394,26 @@ if __name__ == "__main__":
         }
     ]
 
-    print("Sending test newsletter...")
-    send_newsletter(test_articles)
+    if not args.local_smtp:
+        print("Sending test newsletter...")
+        send_newsletter(test_articles)
+    else:
+        from smtp_sink import SMTPSink
+
+        GMAIL_ADDRESS = GMAIL_ADDRESS or "newsletter@localhost"
+        sink = SMTPSink(port=0).start()
+        recipients = [f"reader{i}@localhost" for i in range(args.recipients)]
+
+        print(f"Sending test newsletter to {len(recipients)} recipients via local sink "
+              f"(port {sink.port})...")
+        with DeliveryPool("127.0.0.1", sink.port, use_ssl=False, sessions=args.sessions) as pool:
+            report = deliver_newsletter(test_articles, recipients, pool, archive=False)
+        sink.stop()
+
+        seconds = max(report["seconds"], 1e-6)
+        print(f"\nDelivered {len(report['delivered'])}/{len(recipients)} "
+              f"({len(report['failed'])} failed, {report['attempts']} attempts) "
+              f"over {pool.sessions} session(s)")
+        print(f"  {len(report['delivered']) / seconds:.1f} emails/s, "
+              f"{report['bytes'] / 1024 / 1024 / seconds:.2f} MB/s")
+        print(f"  Sink: {sink.stats}")
@@ -0,0 +1,185 @@
+"""
+SMTP Delivery: Sends one built email to many recipients.
+The message is built once and every recipient gets the same copy, over
+logged-in SMTP connections that stay open between recipients (and between
+the parts of a split digest). Several connections can send in parallel,
+each recipient is retried on temporary failures, and every send returns a
+report of who got it and who didn't.
+"""
+
+import os
+import time
+import queue
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from smtp_stream import message_size, send_message_streaming
+from metrics import external_call
+
+load_dotenv()
+
+# Mail server (defaults to Gmail over SSL)
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "60"))
+
+# Login (defaults to your Gmail address and app password)
+SMTP_USER = os.getenv("SMTP_USER") or os.getenv("GMAIL_ADDRESS")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD") or os.getenv("GMAIL_APP_PASSWORD")
+
+# How many connections send at the same time (Gmail is happiest with 1-3)
+SMTP_SESSIONS = int(os.getenv("SMTP_SESSIONS", "1"))
+
+# How many times to retry a recipient after a temporary failure
+SMTP_RETRIES = int(os.getenv("SMTP_RETRIES", "3"))
+
+
+def _is_permanent(error):
+    """
+    5xx replies mean "never going to work" (bad address, rejected message).
+    Everything else - 4xx replies, dropped connections, timeouts - is worth a retry.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return isinstance(error, smtplib.SMTPNotSupportedError)
+
+
+class DeliveryPool:
+    """
+    Up to `sessions` logged-in SMTP connections, reused for every send.
+    Use as a context manager so the connections are closed at the end.
+    """
+
+    def __init__(self, host=None, port=None, use_ssl=None, sessions=None,
+                 user=None, password=None):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.use_ssl = SMTP_SSL if use_ssl is None else use_ssl
+        self.sessions = max(1, sessions or SMTP_SESSIONS)
+        self.user = user if user is not None else SMTP_USER
+        self.password = password if password is not None else SMTP_PASSWORD
+        self._idle = queue.LifoQueue()
+
+    def _connect(self):
+        """
+        Open and log in a new connection.
+        """
+        with external_call("smtp.connect"):
+            return self._open_connection()
+
+    def _open_connection(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT)
+            server.ehlo()
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            server.ehlo()
+            if server.has_extn("starttls"):
+                server.starttls()
+                server.ehlo()
+
+        if self.user and self.password and server.has_extn("auth"):
+            server.login(self.user, self.password)
+        return server
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, server):
+        self._idle.put(server)
+
+    @staticmethod
+    def _discard(server):
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    def _send_to(self, msg, sender, recipient, size):
+        """
+        Send to one recipient, retrying temporary failures on a fresh connection.
+        Returns (attempts, error) - error is None on success.
+        """
+        error = None
+        attempts = 0
+        for attempt in range(SMTP_RETRIES + 1):
+            attempts += 1
+            server = None
+            try:
+                server = self._acquire()
+                with external_call("smtp.send") as call:
+                    send_message_streaming(server, sender, recipient, msg, size)
+                    call["bytes"] = size
+                self._release(server)
+                return attempts, None
+            except Exception as e:
+                error = e
+                if server is not None:
+                    # After a refusal the connection is still usable; after anything else it may not be
+                    if isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                        self._release(server)
+                    else:
+                        self._discard(server)
+                if _is_permanent(e) or attempt == SMTP_RETRIES:
+                    break
+                time.sleep(2 ** attempt * 0.5)
+
+        return attempts, error
+
+    def deliver(self, msg, recipients, sender=None, size=None):
+        """
+        Send the same message to every recipient (one SMTP transaction each).
+        Returns a report:
+            {"delivered": [...], "failed": {address: error}, "attempts": n,
+             "bytes": n, "seconds": n}
+        """
+        sender = sender or self.user
+        recipients = list(recipients)
+        started = time.time()
+
+        # Measuring also fixes the MIME boundaries, so parallel sends only read the message
+        if size is None:
+            size = message_size(msg)
+
+        workers = max(1, min(self.sessions, len(recipients)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda recipient: self._send_to(msg, sender, recipient, size), recipients
+            ))
+
+        report = {"delivered": [], "failed": {}, "attempts": 0, "bytes": 0}
+        for recipient, (attempts, error) in zip(recipients, results):
+            report["attempts"] += attempts
+            if error is None:
+                report["delivered"].append(recipient)
+                report["bytes"] += size
+            else:
+                report["failed"][recipient] = str(error)
+        report["seconds"] = round(time.time() - started, 3)
+        return report
+
+    def close(self):
+        """
+        Say goodbye on every open connection.
+        """
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                server.quit()
+            except Exception:
+                self._discard(server)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,126 @@
+"""
+SMTP Sink: A tiny local mail server that accepts every email and throws it away.
+Used to test sending speed without spamming real inboxes (or Gmail's limits):
+    python smtp_sink.py                      # listen on 127.0.0.1:8025
+    python send_email.py --local-smtp        # send a test digest through it
+It speaks just enough SMTP for smtplib: EHLO (with SIZE and AUTH), AUTH,
+MAIL, RCPT, DATA, RSET, NOOP and QUIT. It can also refuse a share of
+recipients with a temporary error, to exercise the retry logic.
+"""
+
+import random
+import threading
+import socketserver
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """
+    One SMTP conversation.
+    """
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.stats["connections"] += 1
+
+        self.reply("220 localhost smtp-sink ready")
+        recipients = []
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.wfile.write(b"250-localhost\r\n250-SIZE 104857600\r\n250-8BITMIME\r\n")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                if random.random() < sink.fail_rate:
+                    self.reply("451 Try again later")
+                else:
+                    recipients.append(command)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = self._read_data()
+                with sink.lock:
+                    sink.stats["messages"] += 1
+                    sink.stats["recipients"] += len(recipients)
+                    sink.stats["bytes"] += size
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                # RSET, NOOP and anything else
+                self.reply("250 OK")
+
+    def _read_data(self):
+        """
+        Read (and discard) the message, returning its size.
+        """
+        size = 0
+        while True:
+            line = self.rfile.readline()
+            if not line or line == b".\r\n":
+                return size
+            size += len(line)
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    The sink server. Start it in the background with start(), read .stats.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8025, fail_rate=0.0):
+        super().__init__((host, port), _SinkHandler)
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.stats = {"connections": 0, "messages": 0, "recipients": 0, "bytes": 0}
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """
+        Serve in a background thread. Returns the sink.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# Run the sink on its own
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local SMTP server that discards everything.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="share of recipients to refuse with a temporary error (0-1)")
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.fail_rate)
+    print(f"SMTP sink listening on {args.host}:{sink.port} (Ctrl+C to stop)")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{sink.stats}")
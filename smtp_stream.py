@@ -0,0 +1,194 @@
+"""
+Streaming SMTP: Writes an email straight into the SMTP connection.
+smtplib's sendmail() wants the whole message as one string (and then makes
+more copies of it while escaping and encoding). Here the message is written
+piece by piece, with the same line-ending and "dot-stuffing" rules SMTP
+needs, so a big digest never has to exist as one giant string in memory.
+Each part is written directly (no part is rendered into a buffer first), and
+big attachments (StreamedAttachment) are base64-encoded a block at a time.
+"""
+
+import uuid
+import base64
+import smtplib
+from email import policy
+from email.mime.base import MIMEBase
+
+# Send to the socket in blocks of about this many bytes
+_FLUSH_BYTES = 64 * 1024
+
+# Raw bytes encoded per block: a multiple of 57, so every block is whole 76-character base64 lines
+_BASE64_BLOCK = 57 * 1024
+
+# Text payloads are written in slices of this many characters
+_TEXT_BLOCK = 64 * 1024
+
+
+class StreamedAttachment(MIMEBase):
+    """
+    An attachment that keeps its raw bytes and is base64-encoded block by
+    block as the message is written (instead of holding a base64 copy).
+    Only smtp_stream knows how to write it - msg.as_string() won't include the data.
+    """
+
+    def __init__(self, maintype, subtype, data, filename):
+        super().__init__(maintype, subtype)
+        self["Content-Transfer-Encoding"] = "base64"
+        self.add_header("Content-Disposition", "attachment", filename=filename)
+        self.set_payload("")
+        self.data = memoryview(data)
+
+
+class _CountingSocket:
+    """
+    A fake socket that only counts the bytes sent to it.
+    """
+
+    def __init__(self):
+        self.size = 0
+
+    def sendall(self, data):
+        self.size += len(data)
+
+
+class _DataWriter:
+    """
+    A file-like object that sends an email body over SMTP's DATA command.
+    Every line ends in CRLF, and lines starting with "." get an extra "."
+    (otherwise the server would read a line with a lone "." as the end).
+    At most about _FLUSH_BYTES are held before being sent.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.partial = b""
+        self.out = bytearray()
+
+    def write(self, data):
+        if self.partial:
+            data = self.partial + data
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end == -1:
+                break
+            self._add_line(data[start:end])
+            start = end + 1
+            if len(self.out) >= _FLUSH_BYTES:
+                self._flush()
+        self.partial = data[start:]
+
+    def _add_line(self, line):
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        if line.startswith(b"."):
+            self.out += b"."
+        self.out += line
+        self.out += b"\r\n"
+
+    def _flush(self):
+        self.sock.sendall(self.out)
+        self.out.clear()
+
+    def close(self, terminate=True):
+        """
+        Send whatever is left, then the "." line that ends the message.
+        """
+        if self.partial:
+            self._add_line(self.partial)
+            self.partial = b""
+        if terminate:
+            self.out += b".\r\n"
+        self._flush()
+
+
+def _write_part(part, out):
+    """
+    Write one MIME part (headers, then body or sub-parts) to `out`.
+    """
+    # Pick the boundary first - it's part of the Content-Type header
+    if part.is_multipart() and part.get_boundary() is None:
+        part.set_boundary("=" * 15 + uuid.uuid4().hex + "==")
+
+    for name, value in part.raw_items():
+        out.write(policy.SMTP.fold_binary(name, value))
+    out.write(b"\r\n")
+
+    if part.is_multipart():
+        boundary = part.get_boundary().encode("ascii")
+        for subpart in part.get_payload():
+            out.write(b"--" + boundary + b"\r\n")
+            _write_part(subpart, out)
+            out.write(b"\r\n")
+        out.write(b"--" + boundary + b"--\r\n")
+
+    elif isinstance(part, StreamedAttachment):
+        data = part.data
+        for start in range(0, len(data), _BASE64_BLOCK):
+            out.write(base64.encodebytes(data[start:start + _BASE64_BLOCK]))
+
+    else:
+        payload = part.get_payload()
+        for start in range(0, len(payload), _TEXT_BLOCK):
+            out.write(payload[start:start + _TEXT_BLOCK].encode("utf-8", "surrogateescape"))
+        out.write(b"\r\n")
+
+
+def message_size(msg):
+    """
+    How many bytes the message takes on the wire (without building it in memory).
+    Also fixes the MIME boundaries, so later sends only read the message.
+    """
+    counter = _CountingSocket()
+    writer = _DataWriter(counter)
+    _write_part(msg, writer)
+    writer.close(terminate=False)
+    return counter.size
+
+
+def send_message_streaming(server, from_addr, to_addrs, msg, size=None):
+    """
+    Send `msg` over an open, logged-in smtplib connection, streaming the body.
+    Works like server.sendmail(); raises the same smtplib errors.
+    Pass `size` if you've already measured it with message_size().
+    """
+    if isinstance(to_addrs, str):
+        to_addrs = [to_addrs]
+
+    server.ehlo_or_helo_if_needed()
+
+    # Tell the server the size up front so it can refuse early if it's too big
+    mail_options = []
+    if server.does_esmtp and server.has_extn("size"):
+        mail_options.append(f"SIZE={size if size is not None else message_size(msg)}")
+
+    code, reply = server.mail(from_addr, mail_options)
+    if code != 250:
+        server._rset()
+        raise smtplib.SMTPSenderRefused(code, reply, from_addr)
+
+    refused = {}
+    for address in to_addrs:
+        code, reply = server.rcpt(address)
+        if code not in (250, 251):
+            refused[address] = (code, reply)
+    if len(refused) == len(to_addrs):
+        server._rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    server.putcmd("data")
+    code, reply = server.getreply()
+    if code != 354:
+        server._rset()
+        raise smtplib.SMTPDataError(code, reply)
+
+    writer = _DataWriter(server.sock)
+    _write_part(msg, writer)
+    writer.close()
+
+    code, reply = server.getreply()
+    if code != 250:
+        server._rset()
+        raise smtplib.SMTPDataError(code, reply)
+
+    return refused
@@ -0,0 +1,54 @@
+"""
+Storage: Small helpers for saving state safely, shared by the other modules.
+  - write_atomic() / write_json_atomic(): write a temp file, then swap it in,
+    so a crash halfway through never leaves a corrupt file behind
+  - connect_db(): open a SQLite database in WAL mode (crash-safe, readers
+    don't block the writer), running its one-time setup on first use
+"""
+
+import os
+import json
+import sqlite3
+import threading
+
+# Databases that have been set up in this process
+_setup_lock = threading.Lock()
+_setup_done = set()
+
+
+def write_atomic(path, text):
+    """
+    Write a text file atomically.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json_atomic(path, data):
+    """
+    Write a JSON file atomically.
+    """
+    write_atomic(path, json.dumps(data, indent=2))
+
+
+def connect_db(path, setup=None, rows_as_dicts=False):
+    """
+    Open the SQLite database at `path`. The first time it's opened in this
+    process it's switched to WAL journaling and `setup(conn)` is called to
+    create its tables (and import old data, if there is any).
+    With rows_as_dicts=True rows can be read by column name (row["title"]).
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    if rows_as_dicts:
+        conn.row_factory = sqlite3.Row
+
+    with _setup_lock:
+        if path not in _setup_done:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if setup:
+                setup(conn)
+            _setup_done.add(path)
+
+    return conn
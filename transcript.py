@@ -0,0 +1,101 @@
+"""
+Transcript: The text of a video plus when each part of it was said.
+Segments are joined in a single pass (no repeated string copying), and the
+start time of every segment is kept in compact arrays so we can look up
+the moment any sentence was spoken and link straight to it in the video.
+Only uses the standard library, so helper scripts can import it too.
+"""
+
+from array import array
+from bisect import bisect_right
+
+
+class Transcript:
+    """
+    Flat transcript text (what write_article needs) plus timing.
+    offsets[i] is where segment i starts in `text`, starts[i] is when
+    it starts in the video (seconds).
+    """
+
+    def __init__(self, text, offsets=None, starts=None, language=None):
+        self.text = text
+        self.offsets = array("I", offsets or [])
+        self.starts = array("f", starts or [])
+        self.language = language
+
+    @classmethod
+    def from_segments(cls, segments, language=None):
+        """
+        Build a transcript from the API's segments (objects with .text and .start).
+        """
+        parts = []
+        offsets = array("I")
+        starts = array("f")
+        position = 0
+
+        for segment in segments:
+            piece = segment.text.strip()
+            if not piece:
+                continue
+            if parts:
+                position += 1  # the space between segments
+            offsets.append(position)
+            starts.append(segment.start)
+            parts.append(piece)
+            position += len(piece)
+
+        transcript = cls(" ".join(parts), language=language)
+        transcript.offsets = offsets
+        transcript.starts = starts
+        return transcript
+
+    def __str__(self):
+        return self.text
+
+    def __len__(self):
+        return len(self.text)
+
+    def time_at(self, char_offset):
+        """
+        When (in seconds) the text at this character position was said.
+        """
+        if not self.offsets:
+            return 0.0
+        index = max(0, bisect_right(self.offsets, char_offset) - 1)
+        return float(self.starts[index])
+
+    def find_time(self, phrase):
+        """
+        When (in seconds) a phrase was first said, or None if it isn't in the transcript.
+        """
+        position = self.text.lower().find(phrase.lower())
+        if position == -1:
+            return None
+        return self.time_at(position)
+
+    def link(self, video_url, phrase):
+        """
+        A YouTube link that starts playing where `phrase` is said (or None).
+        """
+        seconds = self.find_time(phrase)
+        if seconds is None:
+            return None
+        separator = "&" if "?" in video_url else "?"
+        return f"{video_url}{separator}t={int(seconds)}s"
+
+    def to_dict(self):
+        return {
+            "language": self.language,
+            "text": self.text,
+            "offsets": self.offsets.tolist(),
+            "starts": [round(start, 2) for start in self.starts]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["text"],
+            offsets=data.get("offsets"),
+            starts=data.get("starts"),
+            language=data.get("language")
+        )
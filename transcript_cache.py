@@ -0,0 +1,67 @@
+"""
+Transcript Cache: Keeps downloaded transcripts on disk, compressed.
+If a run fails after step 2 (or we regenerate articles later), transcripts
+come from here instead of being downloaded from YouTube again.
+Entries are keyed by video ID + language. Also used by rust_app/fetch_transcript.py.
+"""
+
+import os
+import json
+import time
+from disk_cache import DiskCache
+
+# Folder to store cached transcripts
+TRANSCRIPT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcript_cache")
+
+# Oldest (least recently used) transcripts are deleted past this size
+TRANSCRIPT_CACHE_MAX_MB = float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "200"))
+
+_cache = DiskCache(TRANSCRIPT_CACHE_DIR, int(TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024))
+
+
+def _cache_key(video_id, language):
+    return f"{video_id}.{language}"
+
+
+def load_transcript(video_id, languages=("en",)):
+    """
+    Return the cached transcript entry for a video in the first available
+    language (same preference order as the transcript API), or None.
+    The entry is a dict with "video_id", "language", "text" and the segment
+    timing ("offsets", "starts") - see Transcript.from_dict().
+    """
+    data = _cache.get_any([_cache_key(video_id, language) for language in languages])
+    if data is None:
+        return None
+
+    return json.loads(data)
+
+
+def save_transcript(video_id, transcript):
+    """
+    Store a Transcript in the cache (under its language).
+    """
+    entry = transcript.to_dict()
+    entry["video_id"] = video_id
+    entry["cached_at"] = time.time()
+    _cache.put_json(_cache_key(video_id, transcript.language), entry)
+
+
+def cache_stats():
+    """
+    Hit/miss counts for this run, plus the number and size of cached transcripts.
+    """
+    return _cache.stats()
+
+
+# Utility to view/clear the cache
+if __name__ == "__main__":
+    import sys
+
+    if "--clear" in sys.argv:
+        _cache.clear()
+        print("Transcript cache cleared.")
+    else:
+        stats = cache_stats()
+        print(f"Cached transcripts: {stats['entries']} ({stats['bytes'] / 1024 / 1024:.1f} MB "
+              f"of {TRANSCRIPT_CACHE_MAX_MB:.0f} MB)")
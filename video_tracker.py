@@ -1,65 +1,172 @@
 """
 Video Tracker: Keeps track of which videos have already been processed.
 This prevents sending duplicate articles for the same video.
+Stored in a small SQLite database (indexed, crash-safe); an old
+processed_videos.json is imported automatically the first time.
 """
 
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from storage import connect_db
 
-# File to store processed video IDs
-TRACKER_FILE = os.path.join(os.path.dirname(__file__), "processed_videos.json")
+# Database of processed video IDs
+TRACKER_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed_videos.db")
+
+# Old JSON tracker file (migrated into the database on first use)
+TRACKER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed_videos.json")
+
+# Forget videos processed more than this many days ago (0 = keep forever)
+PROCESSED_RETENTION_DAYS = float(os.getenv("PROCESSED_RETENTION_DAYS", "0"))
+
+# SQLite limits how many values fit in one query
+_QUERY_BATCH = 500
+
+
+def _connect():
+    """
+    Open the database, creating (and migrating) it the first time.
+    """
+    return connect_db(TRACKER_DB, _create_tables)
+
+
+def _create_tables(conn):
+    """
+    First use: create the table, then import the old JSON file if there is one.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS processed_videos (
+            video_id TEXT PRIMARY KEY,
+            title TEXT,
+            channel TEXT,
+            processed_at TEXT NOT NULL
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_processed_at ON processed_videos (processed_at)"
+    )
+    conn.commit()
+    _migrate_json(conn)
+
+
+def _migrate_json(conn):
+    """
+    One-time import of the old processed_videos.json file.
+    The file is renamed afterwards so it's never imported twice.
+    """
+    if not os.path.exists(TRACKER_FILE):
+        return
+
+    with open(TRACKER_FILE, "r") as f:
+        data = json.load(f)
+
+    rows = [
+        (video_id, info.get("title"), info.get("channel"),
+         info.get("processed_at") or datetime.now().isoformat())
+        for video_id, info in data.get("videos", {}).items()
+    ]
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO processed_videos (video_id, title, channel, processed_at) "
+            "VALUES (?, ?, ?, ?)",
+            rows
+        )
+
+    os.replace(TRACKER_FILE, TRACKER_FILE + ".migrated")
+    print(f"  ✓ Migrated {len(rows)} processed video(s) from processed_videos.json")
 
 
 def load_processed_videos():
     """
-    Load the list of already-processed video IDs from file.
+    Load every processed video (same shape as the old JSON file).
     """
-    if os.path.exists(TRACKER_FILE):
-        with open(TRACKER_FILE, "r") as f:
-            return json.load(f)
-    return {"videos": {}}
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT video_id, title, channel, processed_at FROM processed_videos ORDER BY processed_at"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return {
+        "videos": {
+            video_id: {"title": title, "channel": channel, "processed_at": processed_at}
+            for video_id, title, channel, processed_at in rows
+        }
+    }
 
 
-def save_processed_videos(data):
+def get_processed_ids(video_ids):
     """
-    Save the processed videos list to file.
+    Return which of these video IDs have already been processed (one query per 500).
     """
-    with open(TRACKER_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    video_ids = list(video_ids)
+    processed = set()
+
+    conn = _connect()
+    try:
+        for start in range(0, len(video_ids), _QUERY_BATCH):
+            batch = video_ids[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT video_id FROM processed_videos WHERE video_id IN ({placeholders})",
+                batch
+            )
+            processed.update(video_id for (video_id,) in rows)
+    finally:
+        conn.close()
+
+    return processed
 
 
 def is_video_processed(video_id):
     """
     Check if a video has already been processed.
     """
-    data = load_processed_videos()
-    return video_id in data["videos"]
+    return video_id in get_processed_ids([video_id])
 
 
 def mark_video_processed(video_id, title, channel):
     """
     Mark a video as processed so we don't send it again.
     """
-    data = load_processed_videos()
-    data["videos"][video_id] = {
-        "title": title,
-        "channel": channel,
-        "processed_at": datetime.now().isoformat()
-    }
-    save_processed_videos(data)
+    mark_videos_processed([{"video_id": video_id, "title": title, "channel": channel}])
+
+
+def _published_before(video, cutoff):
+    """
+    Check if a video came out before `cutoff` (False if we don't know when it came out).
+    """
+    published_at = video.get("published_at")
+    if not published_at:
+        return False
+    try:
+        published = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published < cutoff
 
 
 def filter_new_videos(videos):
     """
     Filter out videos that have already been processed.
+    With PROCESSED_RETENTION_DAYS set, videos older than that are skipped too:
+    they may have been processed and then forgotten, and would be sent again.
     Returns only new videos.
     """
+    processed = get_processed_ids(video["video_id"] for video in videos)
+    cutoff = None
+    if PROCESSED_RETENTION_DAYS > 0:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=PROCESSED_RETENTION_DAYS)
     new_videos = []
 
     for video in videos:
-        if is_video_processed(video["video_id"]):
+        if video["video_id"] in processed:
             print(f"  ⏭ Skipping (already processed): {video['title'][:50]}...")
+        elif cutoff and _published_before(video, cutoff):
+            print(f"  ⏭ Skipping (older than {PROCESSED_RETENTION_DAYS:g} days): {video['title'][:50]}...")
         else:
             new_videos.append(video)
 
@@ -69,21 +176,71 @@ def filter_new_videos(videos):
 def mark_videos_processed(videos):
     """
     Mark multiple videos as processed after successfully sending newsletter.
+    All videos are saved in a single transaction.
     """
-    for video in videos:
-        mark_video_processed(video["video_id"], video["title"], video["channel"])
+    now = datetime.now().isoformat()
+    rows = [(video["video_id"], video["title"], video["channel"], now) for video in videos]
+
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO processed_videos (video_id, title, channel, processed_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+    finally:
+        conn.close()
+
+    if PROCESSED_RETENTION_DAYS > 0:
+        prune_processed_videos(PROCESSED_RETENTION_DAYS)
+
+
+def prune_processed_videos(older_than_days):
+    """
+    Forget videos processed more than `older_than_days` days ago.
+    Each channel's most recently processed videos are always kept, since a
+    quiet channel's latest video keeps showing up as "new" until it posts again.
+    Returns how many were removed.
+    """
+    cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+
+    conn = _connect()
+    try:
+        with conn:
+            cursor = conn.execute("""
+                DELETE FROM processed_videos
+                WHERE processed_at < ?
+                  AND processed_at < (
+                      SELECT MAX(latest.processed_at) FROM processed_videos AS latest
+                      WHERE latest.channel IS processed_videos.channel
+                  )
+            """, (cutoff,))
+        return cursor.rowcount
+    finally:
+        conn.close()
 
 
 def get_processed_count():
     """
     Get the total number of videos we've processed.
     """
-    data = load_processed_videos()
-    return len(data["videos"])
+    conn = _connect()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM processed_videos").fetchone()[0]
+    finally:
+        conn.close()
 
 
 # Utility to view/manage processed videos
 if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 2 and sys.argv[1] == "--prune":
+        removed = prune_processed_videos(float(sys.argv[2]))
+        print(f"Removed {removed} video(s) processed more than {sys.argv[2]} days ago.")
+        sys.exit(0)
+
     data = load_processed_videos()
     print(f"Total processed videos: {len(data['videos'])}\n")
 
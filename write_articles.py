@@ -4,36 +4,105 @@ Takes raw video transcripts and turns them into polished, readable articles.
 """
 
 import os
+import json
+import time
+import hashlib
+import threading
 import anthropic
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from rate_limit import AdaptiveConcurrency
+from disk_cache import DiskCache
+from metrics import external_call, record_tokens
+from article_cache import load_article, save_article, cache_stats as article_cache_stats
+
+# The HTTP library the Anthropic SDK is built on (newer SDK versions use httpx2)
+try:
+    import httpx2 as _http
+except ImportError:
+    import httpx as _http
 
 # Load your API key
 load_dotenv()
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
-# Create the Claude client
+# Max articles written at the same time (shrinks automatically if Claude is busy)
+ARTICLE_CONCURRENCY = int(os.getenv("ARTICLE_CONCURRENCY", "4"))
+
+# How many times to retry an article after a rate-limit / overloaded response
+ARTICLE_RETRIES = int(os.getenv("ARTICLE_RETRIES", "3"))
+
+# Set to 1 to send all articles as one Message Batch (cheaper, but can take a while)
+ARTICLE_BATCH_MODE = os.getenv("ARTICLE_BATCH_MODE") == "1"
+
+# Batch polling: first wait, longest wait between checks, and when to give up (seconds)
+BATCH_POLL_INITIAL = float(os.getenv("BATCH_POLL_INITIAL", "10"))
+BATCH_POLL_MAX = float(os.getenv("BATCH_POLL_MAX", "300"))
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", str(24 * 60 * 60)))
+
+# Which Claude model writes the articles
+ARTICLE_MODEL = "claude-sonnet-4-5-20250929"
+
+# Transcripts longer than this (estimated tokens) are condensed into notes
+# part by part first, then the article is written from the notes
+LONG_TRANSCRIPT_TOKENS = int(os.getenv("LONG_TRANSCRIPT_TOKENS", "60000"))
+
+# Size of each part, and how much neighbouring parts overlap (estimated tokens)
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "20000"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "1000"))
+
+# Rough rule of thumb for English text
+CHARS_PER_TOKEN = 4
+
+# Set to 1 to stream articles as they're written, saving the text to disk
+# as it arrives (a dropped connection can then pick up where it left off)
+ARTICLE_STREAMING = os.getenv("ARTICLE_STREAMING") == "1"
+SPOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "article_spool")
+
+# Notes for each part are cached, so a retry doesn't redo finished parts
+NOTES_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chunk_notes")
+NOTES_CACHE_MAX_MB = float(os.getenv("NOTES_CACHE_MAX_MB", "50"))
+notes_cache = DiskCache(NOTES_CACHE_DIR, int(NOTES_CACHE_MAX_MB * 1024 * 1024), suffix=".txt.gz")
+
+# Shared by every worker, so the limit applies to the whole pipeline
+article_concurrency = AdaptiveConcurrency(ARTICLE_CONCURRENCY)
+
+# Token usage of every response this run (see record_usage)
+usage_log = []
+usage_totals = {
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cache_read_input_tokens": 0,
+    "cache_creation_input_tokens": 0
+}
+_usage_lock = threading.Lock()
+
+# Create the Claude client (set ANTHROPIC_BASE_URL to point it at anthropic_stub.py for testing)
 client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
 
-def write_article(video):
+def is_overload_error(error):
     """
-    Use Claude to transform a video transcript into a magazine-style article.
+    Check if Claude told us to slow down (429 rate limited / 529 overloaded).
+    A stream that already started answers 200, so an overload partway through
+    only shows up as an error event - check its type as well.
     """
-    prompt = f"""You are a skilled magazine writer. Transform this YouTube video transcript into a well-written, engaging article.
-
-VIDEO TITLE: {video['title']}
-CHANNEL: {video['channel']}
-VIDEO URL: {video['url']}
+    if getattr(error, "status_code", None) in (429, 529):
+        return True
+    if isinstance(error, anthropic.APIStatusError) and isinstance(error.body, dict):
+        details = error.body.get("error", error.body)
+        return isinstance(details, dict) and details.get("type") in ("overloaded_error", "rate_limit_error")
+    return False
 
-VIDEO DESCRIPTION:
-{video['description']}
 
-TRANSCRIPT:
-{video['transcript']}
+# The writing guidelines never change between videos, so they go first (as the
+# system prompt) and are marked for prompt caching. Note: Claude only caches
+# prefixes of 1024+ tokens (more for some models), and these guidelines are only
+# about 300 tokens - so right now nothing is cached, and "0 cache read" in the
+# token summary is expected. The marker starts paying off once they grow past that.
+ARTICLE_INSTRUCTIONS = """You are a skilled magazine writer. You transform YouTube video transcripts into well-written, engaging articles.
 
----
-
-Remix this YouTube transcript into a magazine article. Guidelines:
+You will be given a video's title, channel, URL, description and transcript. Remix the transcript into a magazine article. Guidelines:
 - Use the video title and description to correct any transcription errors, especially names of people, companies, or technical terms. The description often contains the correct spellings.
 - Start with an engaging headline (different from the video title)
 - The audience is a curious individual who is generally smart but not a specialist or expert in the area mentioned in the video
@@ -44,38 +113,495 @@ Remix this YouTube transcript into a magazine article. Guidelines:
 
 Format the article in clean markdown."""
 
-    try:
-        message = client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=8192,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
 
-        return message.content[0].text
+# Used to condense one part of a very long transcript before writing the article
+NOTES_INSTRUCTIONS = """You are a research assistant helping a magazine writer. You will be given one part of a long YouTube video transcript. The parts overlap slightly.
+
+Condense your part into detailed notes the writer can work from without seeing the transcript:
+- Every key point, argument and insight, in the order they come up
+- Contrarian viewpoints, memorable anecdotes and surprising facts
+- Key quotes, word for word (clean up filler words or transcription errors)
+- Names of people, companies and technical terms, spelled correctly (use the title and description to fix transcription errors)
+
+Write the notes as plain markdown bullet points. Don't add an introduction or conclusion."""
+
+
+def estimate_tokens(text):
+    """
+    Rough token count (about 4 characters per token).
+    """
+    return len(text) // CHARS_PER_TOKEN
+
+
+def needs_chunking(video):
+    """
+    Check if a transcript is too long to send in a single prompt.
+    """
+    return estimate_tokens(video.get("transcript") or "") > LONG_TRANSCRIPT_TOKENS
+
+
+def split_transcript(text):
+    """
+    Split a long transcript into overlapping windows of about CHUNK_TOKENS,
+    breaking at spaces so words aren't cut in half.
+    """
+    size = CHUNK_TOKENS * CHARS_PER_TOKEN
+    step = max(1, (CHUNK_TOKENS - CHUNK_OVERLAP_TOKENS) * CHARS_PER_TOKEN)
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            space = text.rfind(" ", start + step, end)
+            if space != -1:
+                end = space
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+
+        # Start the next window a little before this one ended (the overlap)
+        next_start = text.find(" ", max(start + 1, end - CHUNK_OVERLAP_TOKENS * CHARS_PER_TOKEN))
+        start = next_start + 1 if next_start != -1 and next_start < end else end
+
+    return chunks
+
+
+def build_article_prompt(video, notes=None):
+    """
+    Build the per-video part of the prompt (everything except the guidelines).
+    For very long videos, condensed notes are sent instead of the transcript.
+    """
+    if notes is None:
+        source = f"""TRANSCRIPT:
+{video['transcript']}"""
+        task = "Remix this YouTube transcript into a magazine article, following the guidelines."
+    else:
+        source = "NOTES FROM THE TRANSCRIPT (condensed part by part, in order):\n\n" + "\n\n".join(notes)
+        task = ("This video was too long to include in full, so you have detailed notes instead. "
+                "Remix them into a magazine article, following the guidelines.")
+
+    return f"""VIDEO TITLE: {video['title']}
+CHANNEL: {video['channel']}
+VIDEO URL: {video['url']}
+
+VIDEO DESCRIPTION:
+{video.get('description', '')}
+
+{source}
+
+---
+
+{task}"""
+
+
+def build_notes_request(video, chunk, part, total_parts):
+    """
+    The Messages API parameters for condensing one part of a long transcript.
+    """
+    return {
+        "model": ARTICLE_MODEL,
+        "max_tokens": 4096,
+        "system": NOTES_INSTRUCTIONS,
+        "messages": [
+            {"role": "user", "content": f"""VIDEO TITLE: {video['title']}
+CHANNEL: {video['channel']}
+
+VIDEO DESCRIPTION:
+{video.get('description', '')}
+
+TRANSCRIPT (part {part} of {total_parts}):
+{chunk}"""}
+        ]
+    }
+
+
+def build_article_request(video, notes=None):
+    """
+    The Messages API parameters for one article (used directly and in batches).
+    """
+    return {
+        "model": ARTICLE_MODEL,
+        "max_tokens": 8192,
+        "system": [
+            {
+                "type": "text",
+                "text": ARTICLE_INSTRUCTIONS,
+                "cache_control": {"type": "ephemeral"}
+            }
+        ],
+        "messages": [
+            {"role": "user", "content": build_article_prompt(video, notes)}
+        ]
+    }
+
+
+class StreamInterrupted(Exception):
+    """
+    The stream ended before Claude finished the article.
+    """
+
+
+def request_hash(request):
+    """
+    A fingerprint of a request, so identical requests can share saved results.
+    """
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_spool_path(request, video):
+    """
+    Where a streamed article is saved while it's written. The name includes the
+    request's fingerprint, so a changed prompt never reuses an old spool.
+    """
+    return os.path.join(SPOOL_DIR, f"{video.get('video_id', 'video')}-{request_hash(request)[:16]}.md")
+
+
+def remove_spool(request, video):
+    """
+    Delete an article's spool file (and its .done marker) once the article
+    is safely in the article cache - the spool is only needed until then.
+    """
+    spool_path = get_spool_path(request, video)
+    for path in (spool_path, spool_path + ".done"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def stream_to_spool(request, spool_path, video, api=None):
+    """
+    Stream an article from Claude, appending text to the spool file as it
+    arrives. If the spool already holds part of the article (the connection
+    dropped last time), Claude continues from there instead of starting over.
+    A finished spool (marked by a .done file) is reused without any API call.
+    Returns (full text, final message or None if reused).
+    """
+    api = api or client
+    done_path = spool_path + ".done"
+    if os.path.exists(done_path) and os.path.exists(spool_path):
+        with open(spool_path, "r", encoding="utf-8") as f:
+            print(f"  ↺ Reusing finished spool for {video['title'][:50]}")
+            return f.read(), None
+
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    partial = ""
+    if os.path.exists(spool_path):
+        with open(spool_path, "r", encoding="utf-8") as f:
+            # Claude won't continue from trailing whitespace
+            partial = f.read().rstrip()
+
+    if partial:
+        print(f"  ↺ Continuing {video['title'][:50]} from {len(partial)} saved characters")
+        request = dict(request, messages=request["messages"] + [
+            {"role": "assistant", "content": partial}
+        ])
+
+    started = time.monotonic()
+    first_token_at = None
+
+    with open(spool_path, "w", encoding="utf-8") as spool:
+        spool.write(partial)
+        spool.flush()
+
+        with api.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                spool.write(text)
+                spool.flush()
+            message = stream.get_final_message()
+
+    # No stop reason means the connection dropped mid-article
+    if message.stop_reason is None:
+        raise StreamInterrupted("stream ended early")
+
+    finished = time.monotonic()
+    first_token_at = first_token_at or finished
+    output_tokens = getattr(message.usage, "output_tokens", 0) or 0
+    stats = {
+        "time_to_first_token": round(first_token_at - started, 2),
+        "tokens_per_second": round(output_tokens / max(finished - first_token_at, 1e-6), 1),
+        "output_tokens": output_tokens
+    }
+    print(f"  ⏱ {video['title'][:40]}: first token after {stats['time_to_first_token']}s, "
+          f"{stats['tokens_per_second']} tokens/sec")
+
+    with open(done_path, "w") as f:
+        json.dump(stats, f)
+
+    with open(spool_path, "r", encoding="utf-8") as f:
+        return f.read(), message
+
+
+def call_claude(request, video, limiter, stream=False):
+    """
+    Send one Messages API request, waiting for a free slot in the concurrency
+    limiter. If Claude says it's rate limited or overloaded, the limit shrinks
+    and we retry with backoff. With stream=True the response is streamed into
+    a spool file, and dropped connections are retried too (picking up where
+    the spool left off). Returns the response text; raises on failure.
+    """
+    spool_path = get_spool_path(request, video) if stream else None
+
+    # Retries and backoff happen here (they also resize the limiter), so the SDK shouldn't retry too
+    api = client.with_options(max_retries=0)
+
+    for attempt in range(ARTICLE_RETRIES + 1):
+        with limiter:
+            try:
+                with external_call("anthropic.messages") as call:
+                    if stream:
+                        text, message = stream_to_spool(request, spool_path, video, api)
+                    else:
+                        message = api.messages.create(**request)
+                        text = message.content[0].text
+                    call["bytes"] = len(text.encode("utf-8"))
+            except Exception as e:
+                # A dropped stream can surface as the SDK's connection error or as a
+                # raw transport error from the HTTP library while reading events
+                retryable = is_overload_error(e) or (
+                    stream and isinstance(e, (anthropic.APIConnectionError, _http.TransportError,
+                                              StreamInterrupted))
+                )
+                if not retryable or attempt == ARTICLE_RETRIES:
+                    raise
+                if is_overload_error(e):
+                    limiter.shrink()
+            else:
+                limiter.grow()
+                if message is not None:
+                    record_usage(video, message.usage)
+                return text
+
+        # Back off (outside the limiter, so the slot is free meanwhile)
+        time.sleep(2 ** attempt)
+
+
+def condense_transcript(video, limiter):
+    """
+    Map step for very long videos: condense each overlapping part of the
+    transcript into notes, in parallel. Finished parts are cached, so a
+    retry only redoes the parts that failed.
+    """
+    chunks = split_transcript(video["transcript"])
+    print(f"  → Long transcript (~{estimate_tokens(video['transcript'])} tokens): "
+          f"condensing {len(chunks)} parts first")
+
+    def condense(numbered_chunk):
+        part, chunk = numbered_chunk
+        request = build_notes_request(video, chunk, part, len(chunks))
+        key = request_hash(request)
+
+        cached = notes_cache.get(key)
+        if cached is not None:
+            return cached.decode("utf-8")
+
+        notes = call_claude(request, video, limiter)
+        notes_cache.put(key, notes.encode("utf-8"))
+        return notes
+
+    with ThreadPoolExecutor(max_workers=max(1, min(ARTICLE_CONCURRENCY, len(chunks)))) as executor:
+        return list(executor.map(condense, enumerate(chunks, start=1)))
+
+
+def record_usage(video, usage):
+    """
+    Keep track of the tokens each article used, including prompt-cache reads
+    and writes, so we can see what caching saves over a whole digest.
+    """
+    entry = {
+        "video_id": video.get("video_id"),
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0
+    }
+
+    with _usage_lock:
+        usage_log.append(entry)
+        for key in usage_totals:
+            usage_totals[key] += entry[key]
+
+    record_tokens(entry)
+
+
+def print_usage_summary():
+    """
+    Print the token totals for this run.
+    """
+    with _usage_lock:
+        totals = dict(usage_totals)
+
+    print(f"  Tokens: {totals['input_tokens']} in "
+          f"(+{totals['cache_read_input_tokens']} cache read, "
+          f"+{totals['cache_creation_input_tokens']} cache write), "
+          f"{totals['output_tokens']} out")
+
+
+def article_cache_key(video):
+    """
+    The article cache fingerprint: a hash of the full request we'd send for
+    this video (model, prompt template, video details and transcript).
+    """
+    return request_hash(build_article_request(video))
+
+
+def write_article(video, limiter=None, stream=None):
+    """
+    Use Claude to transform a video transcript into a magazine-style article.
+    Articles already written for identical inputs come from the article cache.
+    Very long transcripts are condensed into notes first (map), and the
+    article is written from the notes (reduce). With stream=True (default:
+    ARTICLE_STREAMING) the article is streamed to a spool file on disk.
+    Returns None if the article couldn't be written.
+    """
+    if limiter is None:
+        limiter = article_concurrency
+    if stream is None:
+        stream = ARTICLE_STREAMING
+
+    key = article_cache_key(video)
+    cached = load_article(key)
+    if cached:
+        return cached
+
+    try:
+        notes = condense_transcript(video, limiter) if needs_chunking(video) else None
+        request = build_article_request(video, notes)
+        article = call_claude(request, video, limiter, stream=stream)
+        save_article(key, video, article)
+        if stream:
+            remove_spool(request, video)
+        return article
 
     except Exception as e:
-        print(f"  ⚠ Error generating article: {e}")
+        print(f"  ⚠ Error generating article for {video['title'][:50]}: {e}")
         return None
 
 
-def write_articles_for_videos(videos):
+def write_articles_concurrently(videos, concurrency):
+    """
+    Write articles with a thread pool. Returns article texts (or None for
+    failures) in the same order as the videos.
+    """
+    concurrency = max(1, min(concurrency, len(videos) or 1))
+
+    print(f"Writing {len(videos)} article(s), up to {concurrency} at a time...\n")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(write_article, videos))
+
+
+def wait_for_batch(batch):
+    """
+    Poll a Message Batch until it has finished, waiting longer between checks
+    each time. If it takes longer than BATCH_TIMEOUT it's cancelled, and we
+    wait for the cancellation to finish: a cancelled batch still has results
+    for the requests it completed (and charged for) before that.
+    """
+    delay = BATCH_POLL_INITIAL
+    deadline = time.monotonic() + BATCH_TIMEOUT
+    cancelled = False
+
+    while batch.processing_status != "ended":
+        if not cancelled and time.monotonic() > deadline:
+            print(f"  ⚠ Batch {batch.id} timed out, cancelling it (keeping what it finished)")
+            with external_call("anthropic.batches.cancel"):
+                batch = client.messages.batches.cancel(batch.id)
+            cancelled = True
+            continue
+
+        time.sleep(delay)
+        delay = min(delay * 2, BATCH_POLL_MAX)
+        with external_call("anthropic.batches.retrieve"):
+            batch = client.messages.batches.retrieve(batch.id)
+
+    return batch
+
+
+def write_articles_in_batch(videos, concurrency=None):
+    """
+    Send every article request as one Message Batch (half the price of normal
+    calls, no rate-limit juggling), then map the results back to the videos.
+    Anything the batch couldn't write falls back to the normal write_article path,
+    and so do very long videos (they need the notes step first).
+    Returns article texts (or None for failures) in the same order as the videos.
+    """
+    if concurrency is None:
+        concurrency = ARTICLE_CONCURRENCY
+
+    # Articles we've already paid for don't go into the batch
+    keys = [article_cache_key(video) for video in videos]
+    results = [load_article(key) for key in keys]
+    batch_requests = [
+        {"custom_id": f"video-{i}", "params": build_article_request(video)}
+        for i, video in enumerate(videos)
+        if results[i] is None and not needs_chunking(video)
+    ]
+
+    try:
+        if batch_requests:
+            with external_call("anthropic.batches.create") as call:
+                batch = client.messages.batches.create(requests=batch_requests)
+                call["bytes"] = len(json.dumps(batch_requests))
+            print(f"Submitted batch {batch.id} with {len(batch_requests)} article(s), waiting for results...\n")
+            batch = wait_for_batch(batch)
+
+            with external_call("anthropic.batches.results"):
+                entries = list(client.messages.batches.results(batch.id))
+
+            for entry in entries:
+                index = int(entry.custom_id.split("-", 1)[1])
+                if entry.result.type == "succeeded":
+                    record_usage(videos[index], entry.result.message.usage)
+                    results[index] = entry.result.message.content[0].text
+                    save_article(keys[index], videos[index], results[index])
+                else:
+                    print(f"  ⚠ Batch could not write {videos[index]['title'][:50]}: {entry.result.type}")
+
+    except Exception as e:
+        print(f"  ⚠ Batch failed: {e}")
+
+    # Retry anything that didn't come back from the batch, one call per video
+    failed = [i for i, article in enumerate(results) if article is None]
+    if failed:
+        print(f"\n  → Writing {len(failed)} article(s) directly instead\n")
+        retried = write_articles_concurrently([videos[i] for i in failed], concurrency)
+        for i, article in zip(failed, retried):
+            results[i] = article
+
+    return results
+
+
+def write_articles_for_videos(videos, concurrency=None, batch=None):
     """
     Generate articles for all videos with transcripts.
+    Several articles are written at once (up to `concurrency`, adapting to
+    Claude's rate limits), or all in one Message Batch if batch=True
+    (default: ARTICLE_BATCH_MODE). Articles come back in the same order as the videos.
     """
+    if concurrency is None:
+        concurrency = ARTICLE_CONCURRENCY
+    if batch is None:
+        batch = ARTICLE_BATCH_MODE
+
     print("\nGenerating articles with Claude AI...\n")
     print("=" * 60)
 
+    if batch:
+        results = write_articles_in_batch(videos, concurrency)
+    else:
+        results = write_articles_concurrently(videos, concurrency)
+
     articles = []
 
-    for video in videos:
+    for video, article in zip(videos, results):
         print(f"Writing article: {video['title'][:50]}...")
 
-        article = write_article(video)
-
         if article:
             articles.append({
+                "video_id": video.get("video_id"),
                 "title": video["title"],
                 "channel": video["channel"],
                 "url": video["url"],
@@ -87,6 +613,9 @@ def write_articles_for_videos(videos):
 
     print("=" * 60)
     print(f"Generated {len(articles)} articles")
+    print_usage_summary()
+    stats = article_cache_stats()
+    print(f"  (article cache: {stats['hits']} hits, {stats['misses']} misses)")
 
     return articles
 
@@ -0,0 +1,155 @@
+"""
+YouTube Cache: Remembers YouTube lookups that (almost) never change.
+A channel's ID and uploads playlist stay the same forever, so once we've
+resolved a handle we can skip the channels().list API call on later runs.
+Same for Shorts: once a video is a Short (or not), it stays that way.
+"""
+
+import os
+import json
+import time
+import threading
+from storage import write_json_atomic
+
+# File to store resolved channels (shared with the Rust app), next to processed_videos.db
+CHANNEL_CACHE_FILE = os.path.join(os.path.dirname(__file__), "channel_cache.json")
+
+# File to store "is this video a Short?" verdicts, keyed by video ID
+SHORTS_CACHE_FILE = os.path.join(os.path.dirname(__file__), "shorts_cache.json")
+
+# Re-check a channel after this many days, just in case something changed
+CHANNEL_CACHE_TTL_DAYS = float(os.getenv("CHANNEL_CACHE_TTL_DAYS", "30"))
+
+# Channels are looked up from several threads at once
+_lock = threading.Lock()
+_channels = None
+_channels_dirty = False
+_shorts = None
+_shorts_dirty = False
+
+
+def _cache_key(channel_handle):
+    """
+    Handles are case-insensitive on YouTube, so "@MrBeast" and "mrbeast" match.
+    """
+    return channel_handle.lstrip("@").lower()
+
+
+def _load_json(path):
+    """
+    Load a JSON cache file, or an empty dict if it's missing or broken.
+    """
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    return {}
+
+
+def _get_channels():
+    global _channels
+    if _channels is None:
+        _channels = _load_json(CHANNEL_CACHE_FILE)
+    return _channels
+
+
+def get_cached_channel(channel_handle):
+    """
+    Return the cached channel info for a handle, or None if we don't know it
+    yet (or the entry is older than CHANNEL_CACHE_TTL_DAYS).
+    """
+    with _lock:
+        entry = _get_channels().get(_cache_key(channel_handle))
+
+    if not entry:
+        return None
+
+    age_days = (time.time() - entry.get("resolved_at", 0)) / 86400
+    if age_days > CHANNEL_CACHE_TTL_DAYS:
+        return None
+
+    return {
+        "channel_id": entry["channel_id"],
+        "channel_name": entry["channel_name"],
+        "uploads_playlist_id": entry["uploads_playlist_id"]
+    }
+
+
+def cache_channel(channel_handle, channel_info):
+    """
+    Remember a freshly resolved channel. Call save_channel_cache() to write it out.
+    """
+    global _channels_dirty
+    with _lock:
+        _get_channels()[_cache_key(channel_handle)] = {
+            "channel_id": channel_info["channel_id"],
+            "channel_name": channel_info["channel_name"],
+            "uploads_playlist_id": channel_info["uploads_playlist_id"],
+            "resolved_at": time.time()
+        }
+        _channels_dirty = True
+
+
+def save_channel_cache():
+    """
+    Write the channel cache to disk (only if something changed).
+    """
+    global _channels_dirty
+    with _lock:
+        if _channels_dirty:
+            write_json_atomic(CHANNEL_CACHE_FILE, _get_channels())
+            _channels_dirty = False
+
+
+def _get_shorts():
+    global _shorts
+    if _shorts is None:
+        _shorts = _load_json(SHORTS_CACHE_FILE)
+    return _shorts
+
+
+def get_cached_short_verdict(video_id):
+    """
+    Return True/False if we already know whether this video is a Short,
+    or None if we've never checked it.
+    """
+    with _lock:
+        return _get_shorts().get(video_id)
+
+
+def cache_short_verdict(video_id, is_short):
+    """
+    Remember whether a video is a Short. Call save_shorts_cache() to write it out.
+    """
+    global _shorts_dirty
+    with _lock:
+        _get_shorts()[video_id] = bool(is_short)
+        _shorts_dirty = True
+
+
+def save_shorts_cache():
+    """
+    Write the Shorts verdicts to disk (only if something changed).
+    """
+    global _shorts_dirty
+    with _lock:
+        if _shorts_dirty:
+            write_json_atomic(SHORTS_CACHE_FILE, _get_shorts())
+            _shorts_dirty = False
+
+
+# Utility to view the cached channels
+if __name__ == "__main__":
+    channels = _get_channels()
+    print(f"Cached channels: {len(channels)}\n")
+
+    for handle, info in sorted(channels.items()):
+        age_days = (time.time() - info.get("resolved_at", 0)) / 86400
+        print(f"• @{handle}: {info['channel_name']}")
+        print(f"  Uploads: {info['uploads_playlist_id']} (resolved {age_days:.0f} days ago)\n")
+
+    shorts = _get_shorts()
+    short_count = sum(1 for is_short in shorts.values() if is_short)
+    print(f"Cached Shorts verdicts: {len(shorts)} ({short_count} Shorts)")